@@ -3,21 +3,57 @@
 AI Personalizer - Generate customized outreach messages using Google Gemini
 """
 
-import os
 import json
 from typing import Dict, Optional
-import google.generativeai as genai
 from dotenv import load_dotenv
+from utils.ai_client import get_ai_client
 
 load_dotenv()
 
+# Static outreach instructions, set once as the model's system instruction
+OUTREACH_SYSTEM_INSTRUCTION = """You are writing on behalf of Eleven Views, a boutique production company launching a high-end sports management practice.
+
+ELEVEN VIEWS SIGNATURE OFFERINGS:
+- Cinematic documentary and episodic storytelling for teams & athletes
+- Live event capture, highlight architecture, and behind-the-scenes coverage
+- Athlete brand architecture, NIL strategy, and sponsorship packaging
+- Hospitality design, premium partner experiences, and in-game media lounges
+- Cross-platform content studios (broadcast, OTT, social, experiential)
+- Strategic dealmaking with leagues, rights-holders, and brand partners
+
+INSTRUCTIONS:
+1. Address them by business name (no "Hi" or "Hey"—open with name and insight).
+2. Reference something specific about their presence (market, segment, reputation, facility quality, etc.).
+3. Mention ONE signature Eleven Views capability that unlocks value for them.
+4. Include a soft call-to-action
+5. Keep it bespoke and cinematic—NOT transactional or salesy.
+6. Do NOT use generic phrases like "I came across" or "I noticed".
+7. Do NOT ask obvious questions they can answer themselves.
+8. Emphasize how Eleven Views elevates their story, partners, or athletes.
+
+Write ONLY the message body. No subject line, no signature, no greeting beyond business name."""
+
+# Per-lead portion of an outreach request
+OUTREACH_PROMPT = """LEAD INFORMATION:
+- Business Name: {name}
+- Category: {category}
+- Location: {city}, {state}
+- Website: {website}
+- Rating: {rating}/5 with {review_count} reviews
+- AI Insights: {ai_insights}
+
+WRITING STYLE:
+- Tone: {tone}
+- Length: {length}
+- Style: {style}
+"""
+
 class AIPersonalizer:
     """AI-powered personalized outreach message generator"""
     
     def __init__(self):
         """Initialize AI personalizer"""
-        genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        self.ai = get_ai_client()
         
         # Eleven Views brand voice templates
         self.templates = {
@@ -58,48 +94,22 @@ class AIPersonalizer:
         try:
             template = self.templates.get(template_style, self.templates['professional'])
             
-            # Build comprehensive context
-            context = f"""
-You are writing on behalf of Eleven Views, a boutique production company launching a high-end sports management practice.
-
-LEAD INFORMATION:
-- Business Name: {lead.get('name', 'N/A')}
-- Category: {lead.get('category', 'N/A')}
-- Location: {lead.get('city', 'N/A')}, {lead.get('state', 'N/A')}
-- Website: {lead.get('website', 'No website found')}
-- Rating: {lead.get('rating', 'N/A')}/5 with {lead.get('review_count', 0)} reviews
-- AI Insights: {lead.get('ai_insights', 'N/A')}
-
-ELEVEN VIEWS SIGNATURE OFFERINGS:
-- Cinematic documentary and episodic storytelling for teams & athletes
-- Live event capture, highlight architecture, and behind-the-scenes coverage
-- Athlete brand architecture, NIL strategy, and sponsorship packaging
-- Hospitality design, premium partner experiences, and in-game media lounges
-- Cross-platform content studios (broadcast, OTT, social, experiential)
-- Strategic dealmaking with leagues, rights-holders, and brand partners
-
-WRITING STYLE:
-- Tone: {template['tone']}
-- Length: {template['length']}
-- Style: {template['style']}
-
-INSTRUCTIONS:
-1. Address them by business name (no "Hi" or "Hey"—open with name and insight).
-2. Reference something specific about their presence (market, segment, reputation, facility quality, etc.).
-3. Mention ONE signature Eleven Views capability that unlocks value for them.
-4. Include a soft call-to-action
-5. Keep it bespoke and cinematic—NOT transactional or salesy.
-6. Do NOT use generic phrases like "I came across" or "I noticed".
-7. Do NOT ask obvious questions they can answer themselves.
-8. Emphasize how Eleven Views elevates their story, partners, or athletes.
-
-{f'ADDITIONAL CONTEXT: {custom_context}' if custom_context else ''}
-
-Write ONLY the message body. No subject line, no signature, no greeting beyond business name.
-"""
+            # Only the per-lead fields are sent; the brand brief is the system instruction
+            context = OUTREACH_PROMPT.format(
+                name=lead.get('name', 'N/A'),
+                category=lead.get('category', 'N/A'),
+                city=lead.get('city', 'N/A'),
+                state=lead.get('state', 'N/A'),
+                website=lead.get('website', 'No website found'),
+                rating=lead.get('rating', 'N/A'),
+                review_count=lead.get('review_count', 0),
+                ai_insights=lead.get('ai_insights', 'N/A'),
+                **template
+            )
+            if custom_context:
+                context += f"\nADDITIONAL CONTEXT: {custom_context}\n"
             
-            response = self.model.generate_content(context)
-            message = response.text.strip()
+            message = self.ai.generate(context, system_instruction=OUTREACH_SYSTEM_INSTRUCTION)
             
             # Clean up any unwanted formatting
             message = message.replace('**', '').replace('*', '')
@@ -162,7 +172,7 @@ Examples of good subject lines:
 Write ONLY the subject line, nothing else.
 """
             
-            response = self.model.generate_content(
+            subject = self.ai.generate(
                 context.format(
                     name=lead.get('name', 'your business'),
                     category=lead.get('category', 'businesses'),
@@ -170,7 +180,7 @@ Write ONLY the subject line, nothing else.
                 )
             )
             
-            subject = response.text.strip().replace('"', '').replace("'", '')
+            subject = subject.replace('"', '').replace("'", '')
             return subject[:80]  # Limit length
             
         except:
@@ -205,8 +215,7 @@ Write a brief, natural follow-up that:
 Keep it short (2-3 sentences).
 """
             
-            response = self.model.generate_content(context)
-            return response.text.strip()
+            return self.ai.generate(context)
             
         except:
             return f"""Just following up on my previous note—our Eleven Views team would love to explore where we can elevate {lead.get('name')}. Let me know if you’re open to a quick conversation."""
@@ -39,6 +39,7 @@ def sync_leads():
         status = data.get('status', 'qualified')
         min_score = data.get('min_score', 60)
         batch_size = data.get('batch_size', 100)
+        force = bool(data.get('force', False))  # Re-send leads unchanged since their last sync
         
         hubspot = get_hubspot()
         
@@ -48,22 +49,23 @@ def sync_leads():
                 'error': 'HubSpot not enabled. Add HUBSPOT_API_KEY to .env'
             }), 400
         
-        # Get leads
-        leads = db.get_leads(status=status, min_score=min_score, limit=10000)
+        # Stream leads in batches instead of loading them all
+        stats = {'total': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'skipped': 0}
+        for batch in db.iter_lead_batches(status=status, min_score=min_score, batch_size=batch_size):
+            batch_stats = hubspot.sync_leads_batch(batch, force=force)
+            for key in stats:
+                stats[key] += batch_stats.get(key, 0)
         
-        if not leads:
+        if not stats['total']:
             return jsonify({
                 'success': False,
                 'error': 'No leads found matching criteria'
             }), 404
         
-        # Sync
-        stats = hubspot.sync_leads_batch(leads)
-        
         return jsonify({
             'success': True,
             'stats': stats,
-            'leads_synced': len(leads)
+            'leads_synced': stats['total']
         })
         
     except Exception as e:
@@ -75,9 +77,11 @@ def sync_leads():
 def sync_single_lead(lead_id: int):
     """Sync a single lead to HubSpot"""
     try:
+        data = request.json or {}
+        force = bool(data.get('force', False))  # Re-send even if unchanged since the last sync
+        
         # Get lead from database
-        leads = db.get_leads(limit=10000)
-        lead = next((l for l in leads if l['id'] == lead_id), None)
+        lead = db.get_lead(lead_id)
         
         if not lead:
             return jsonify({'success': False, 'error': 'Lead not found'}), 404
@@ -91,7 +95,7 @@ def sync_single_lead(lead_id: int):
             }), 400
         
         # Sync lead
-        result = hubspot.sync_lead(lead)
+        result = hubspot.sync_lead(lead, force=force)
         
         return jsonify(result)
         
@@ -49,13 +49,21 @@ def health_check():
 
 @api_bp.route('/leads', methods=['GET'])
 def get_leads():
-    """Get leads with filtering"""
+    """
+    Get leads with filtering
+    
+    Pages with an opaque cursor: pass the previous response's next_cursor
+    as ?cursor= until it comes back null. ?sort= is 'score' (default) or
+    'created'. The legacy ?offset= is still honored when given.
+    """
     try:
         status = request.args.get('status')
         min_score = request.args.get('min_score', type=int)
         city = request.args.get('city')
         limit = request.args.get('limit', default=100, type=int)
-        offset = request.args.get('offset', default=0, type=int)
+        offset = request.args.get('offset', type=int)
+        page_cursor = request.args.get('cursor')
+        sort = request.args.get('sort', default='score')
         
         # Validate inputs
         if limit > 1000:
@@ -63,19 +71,36 @@ def get_leads():
         if limit < 1:
             return jsonify({'error': 'Limit must be at least 1'}), 400
         
-        leads = db.get_leads(
-            status=status,
-            min_score=min_score,
-            city=city,
-            limit=limit,
-            offset=offset
-        )
+        if offset is not None and not page_cursor:
+            leads = db.get_leads(
+                status=status,
+                min_score=min_score,
+                city=city,
+                limit=limit,
+                offset=offset
+            )
+            next_cursor = None
+        else:
+            try:
+                page = db.get_leads_page(
+                    status=status,
+                    min_score=min_score,
+                    city=city,
+                    limit=limit,
+                    cursor=page_cursor,
+                    sort=sort
+                )
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            leads = page['leads']
+            next_cursor = page['next_cursor']
         
         return jsonify({
             'leads': leads,
             'count': len(leads),
             'limit': limit,
-            'offset': offset
+            'offset': offset or 0,
+            'next_cursor': next_cursor
         })
     except Exception as e:
         logger.error(f"Error getting leads: {e}", exc_info=True)
@@ -85,8 +110,7 @@ def get_leads():
 def get_lead(lead_id: int):
     """Get single lead by ID"""
     try:
-        leads = db.get_leads(limit=10000)  # Get all to find by ID
-        lead = next((l for l in leads if l['id'] == lead_id), None)
+        lead = db.get_lead(lead_id)
         
         if not lead:
             return jsonify({'error': 'Lead not found'}), 404
@@ -38,6 +38,14 @@ DEFAULT_MAX_RESULTS = 100
 DEFAULT_MIN_RATING = 4.2  # Minimum Google rating (1.0 - 5.0)
 DEFAULT_MIN_SCORE = 68    # Minimum AI score for auto-qualification
 
+# Parallel enrichment workers per pipeline run (email finding + AI calls).
+# Shared rate limiters still cap the request rate across workers.
+ENRICHMENT_CONCURRENCY = int(os.getenv('ENRICHMENT_CONCURRENCY', 4))
+
+# Leads scored per Gemini request. The shared prompt context is sent once per
+# batch; set to 1 to score every lead with its own request.
+AI_SCORING_BATCH_SIZE = int(os.getenv('AI_SCORING_BATCH_SIZE', 10))
+
 # Lead scoring weights (adjust to fit your ICP)
 SCORING_WEIGHTS = {
     'has_website': 8,
@@ -60,6 +68,14 @@ AI_MODEL = 'gemini-2.0-flash-exp'  # Fast and cost-effective
 # Maximum tokens for AI responses
 MAX_AI_TOKENS = 500
 
+# Scoring prompt version. AI analyses are cached by a hash of the lead's
+# prompt inputs, the prompt templates and the model; bump this to force
+# every lead to be re-scored even if the templates are unchanged.
+AI_PROMPT_VERSION = 1
+
+# How long a cached AI analysis stays valid (unchanged re-scrapes reuse it)
+AI_ANALYSIS_CACHE_TTL = int(os.getenv('AI_ANALYSIS_CACHE_TTL', 30 * 24 * 3600))  # 30 days
+
 # ==============================================================================
 # TARGET INDUSTRIES (Your Ideal Customer Profile)
 # ==============================================================================
@@ -196,6 +212,76 @@ SMTP_USERNAME = os.getenv('SMTP_USERNAME')
 SMTP_PASSWORD = os.getenv('SMTP_PASSWORD')
 SMTP_ENABLED = False
 
+# ==============================================================================
+# EMAIL FINDER SETTINGS
+# ==============================================================================
+
+# Per-request timeout for Hunter / Clearbit / Snov calls (seconds)
+EMAIL_PROVIDER_TIMEOUT = float(os.getenv('EMAIL_PROVIDER_TIMEOUT', 10))
+
+# Domain email lookups are stored in the cache: found emails (with provider
+# and confidence) for EMAIL_LOOKUP_TTL, domains no provider knows for
+# EMAIL_LOOKUP_NEGATIVE_TTL
+EMAIL_LOOKUP_TTL = int(os.getenv('EMAIL_LOOKUP_TTL', 30 * 24 * 3600))  # 30 days
+EMAIL_LOOKUP_NEGATIVE_TTL = int(os.getenv('EMAIL_LOOKUP_NEGATIVE_TTL', 7 * 24 * 3600))  # 7 days
+
+# Email verification results are cached per address for EMAIL_VERIFY_TTL;
+# bulk verification (verify_emails.py) runs EMAIL_VERIFY_WORKERS requests
+# at a time, still paced by the provider rate limit
+EMAIL_VERIFY_TTL = int(os.getenv('EMAIL_VERIFY_TTL', 30 * 24 * 3600))  # 30 days
+EMAIL_VERIFY_WORKERS = int(os.getenv('EMAIL_VERIFY_WORKERS', 4))
+
+# Keep-alive connections pooled per provider (one per concurrent worker)
+EMAIL_HTTP_POOL_SIZE = int(os.getenv('EMAIL_HTTP_POOL_SIZE', ENRICHMENT_CONCURRENCY))
+
+# Race mode: query all configured providers concurrently and take the first
+# result with at least EMAIL_RACE_MIN_CONFIDENCE (otherwise the most
+# confident one). Faster, but spends credits on every provider per domain.
+EMAIL_FINDER_RACE = os.getenv('EMAIL_FINDER_RACE', 'false').lower() == 'true'
+EMAIL_RACE_MIN_CONFIDENCE = int(os.getenv('EMAIL_RACE_MIN_CONFIDENCE', 70))
+
+# Circuit breakers: a provider whose calls fail at CIRCUIT_FAILURE_RATE or
+# more (at least CIRCUIT_MIN_CALLS calls in the last CIRCUIT_WINDOW seconds)
+# is skipped for CIRCUIT_RECOVERY_TIMEOUT seconds, then probed with one call
+CIRCUIT_FAILURE_RATE = float(os.getenv('CIRCUIT_FAILURE_RATE', 0.5))
+CIRCUIT_MIN_CALLS = int(os.getenv('CIRCUIT_MIN_CALLS', 5))
+CIRCUIT_WINDOW = float(os.getenv('CIRCUIT_WINDOW', 60))
+CIRCUIT_RECOVERY_TIMEOUT = float(os.getenv('CIRCUIT_RECOVERY_TIMEOUT', 30))
+
+# ==============================================================================
+# CACHE SETTINGS
+# ==============================================================================
+
+# Persistent cache backend: 'file' (one JSON file per key under cache/) or
+# 'sqlite' (single WAL database shared safely by all worker processes)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'file').lower()
+
+# SQLite backend settings
+CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', 'cache/cache.db')
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 512 * 1024 * 1024))  # LRU-evicted above 512 MB
+CACHE_SWEEP_INTERVAL = int(os.getenv('CACHE_SWEEP_INTERVAL', 300))  # Seconds between expiry sweeps (0 = off)
+
+# Serialization of stored cache entries: 'msgpack' (json if msgpack is not
+# installed), 'json' or 'pickle'; compression: 'zlib', 'zstd' (needs
+# zstandard) or 'none'. Entries written in any format, including old
+# plain-JSON ones, stay readable after changing these, except pickled ones.
+# Pickle runs code when loading, so only enable it when no one else can
+# write to the cache directory or database: with any other serializer,
+# pickled entries are refused and recomputed.
+CACHE_SERIALIZER = os.getenv('CACHE_SERIALIZER', 'msgpack').lower()
+CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'zlib').lower()
+
+# Background threads refreshing stale-while-revalidate entries
+CACHE_REFRESH_WORKERS = int(os.getenv('CACHE_REFRESH_WORKERS', 2))
+
+# Google Maps search results: fresh for 1 hour; with serve_stale, older
+# results up to this age are returned at once and refreshed in the background
+SCRAPE_STALE_TTL = int(os.getenv('SCRAPE_STALE_TTL', 24 * 3600))  # 24 hours
+
+# In-process LRU tier in front of the persistent cache (per worker process)
+CACHE_MEMORY_MAX_ENTRIES = int(os.getenv('CACHE_MEMORY_MAX_ENTRIES', 1024))
+CACHE_MEMORY_MAX_BYTES = int(os.getenv('CACHE_MEMORY_MAX_BYTES', 64 * 1024 * 1024))  # 64 MB
+
 # ==============================================================================
 # COMPLIANCE & ETHICS
 # ==============================================================================
@@ -203,6 +289,15 @@ SMTP_ENABLED = False
 # Rate limiting (requests per minute)
 RATE_LIMIT_RPM = 10
 
+# API rate limiter backend: 'shared' keeps one budget per service across all
+# worker processes in a small SQLite file; 'local' limits each process alone
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'shared').lower()
+RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', 'data/rate_limits.db')
+
+# Rates slowed by 429s (or tightened by quota headers) return to the
+# configured limits this long after their last adjustment
+RATE_LIMIT_ADAPT_TTL = int(os.getenv('RATE_LIMIT_ADAPT_TTL', 3600))  # 1 hour
+
 # Respect robots.txt
 RESPECT_ROBOTS = True
 
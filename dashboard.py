@@ -3,7 +3,7 @@
 Flask dashboard for the Eleven Views Opportunity Engine
 """
 
-from flask import Flask, render_template_string, jsonify, request, send_file
+from flask import Flask, render_template_string, jsonify, request, Response, stream_with_context
 from database import Database
 from ai_personalizer import AIPersonalizer
 from utils.logger import get_logger
@@ -1427,7 +1427,8 @@ DASHBOARD_HTML = """
             .then(data => {
                 if (data.success) {
                     showSearchStatus(
-                        `✅ Generated ${data.stats.saved || data.stats.total || 0} leads! ${data.stats.qualified || 0} auto-qualified.`,
+                        `✅ Generated ${data.stats.saved || data.stats.total || 0} leads! ${data.stats.qualified || 0} auto-qualified.` +
+                        (data.stats.served_stale ? ' (from cached search results; refreshing in background)' : ''),
                         'success'
                     );
                     
@@ -1514,8 +1515,7 @@ def get_leads():
 @app.route('/api/leads/<int:lead_id>')
 def get_lead(lead_id):
     """Get single lead details"""
-    leads = db.get_leads(limit=1)
-    lead = next((l for l in leads if l['id'] == lead_id), None)
+    lead = db.get_lead(lead_id)
     
     if lead:
         return jsonify(lead)
@@ -1561,17 +1561,18 @@ def generate_leads():
         generator = LeadGenerator()
         
         # Generate leads
+        # Repeat searches return cached results at once (refreshed in the background)
         stats = generator.process_leads(
             search_query=search_query,
             max_results=max_results,
-            min_score=min_score
+            min_score=min_score,
+            serve_stale=True
         )
         
         # Auto-qualify high-rated leads if enabled
         if auto_qualify:
-            all_leads = db.get_leads(limit=10000)
-            # Get most recently added leads (last batch)
-            recent_leads = all_leads[:max_results] if len(all_leads) >= max_results else all_leads
+            # Leads saved by this run
+            recent_leads = db.get_leads_by_ids(stats.get('lead_ids', []))
             
             qualified_count = 0
             for lead in recent_leads:
@@ -1600,31 +1601,30 @@ def generate_leads():
 def export_leads():
     """Export leads to CSV"""
     status = request.args.get('status')
-    leads = db.export_leads(status=status)
+    fieldnames = ['name', 'category', 'city', 'state', 'phone', 'email', 'website', 
+                 'rating', 'review_count', 'ai_lead_score', 'status', 'ai_outreach_message']
     
-    # Create CSV
-    output = io.StringIO()
-    if leads:
-        fieldnames = ['name', 'category', 'city', 'state', 'phone', 'email', 'website', 
-                     'rating', 'review_count', 'ai_lead_score', 'status', 'ai_outreach_message']
-        
+    def generate():
+        # Stream the CSV in chunks straight from the database cursor
+        output = io.StringIO()
         writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
         writer.writeheader()
-        writer.writerows(leads)
-    
-    # Convert to bytes
-    output.seek(0)
-    bytes_output = io.BytesIO()
-    bytes_output.write(output.getvalue().encode('utf-8'))
-    bytes_output.seek(0)
+        
+        for batch in db.iter_lead_batches(status=status):
+            writer.writerows(batch)
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate(0)
+        
+        if output.tell():
+            yield output.getvalue()
     
     filename = f"leads_{status or 'all'}_{datetime.now().strftime('%Y%m%d')}.csv"
     
-    return send_file(
-        bytes_output,
+    return Response(
+        stream_with_context(generate()),
         mimetype='text/csv',
-        as_attachment=True,
-        download_name=filename
+        headers={'Content-Disposition': f'attachment; filename={filename}'}
     )
 
 if __name__ == '__main__':
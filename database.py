@@ -4,28 +4,87 @@ Database module for Recipe Labs Lead Generation
 SQLite-based storage with easy PostgreSQL migration path
 """
 
+import os
+import re
 import sqlite3
 import json
+import base64
+import argparse
+import threading
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from pathlib import Path
 
 class Database:
     """SQLite database manager for leads"""
     
+    # Connection tuning applied to every pooled connection.
+    # WAL lets dashboard readers run while a pipeline run is writing;
+    # NORMAL sync is durable across app crashes in WAL mode.
+    PRAGMAS = (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('cache_size', -20000),       # ~20MB page cache per connection
+        ('mmap_size', 268435456),     # 256MB memory-mapped reads
+        ('temp_store', 'MEMORY'),
+    )
+    
+    # Per-connection prepared statement cache size
+    STATEMENT_CACHE_SIZE = 256
+    
     def __init__(self, db_path: str = "data/leads.db"):
         """Initialize database connection"""
         self.db_path = db_path
         
+        # Thread-local connection pool (one long-lived connection per thread)
+        self._local = threading.local()
+        
         # Create data directory if it doesn't exist
-        Path("data").mkdir(exist_ok=True)
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
         
         # Initialize database schema
         self._init_schema()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new tuned connection to the database"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=30.0,
+            cached_statements=self.STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma, value in self.PRAGMAS:
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's pooled connection
+        
+        Connections are reused for the lifetime of the thread so SQLite's
+        prepared statement cache stays warm. A connection inherited across
+        a fork (e.g. gunicorn preload) is discarded and reopened.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    def close(self):
+        """Close the calling thread's pooled connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            if self._local.pid == os.getpid():
+                conn.close()
+            self._local.conn = None
+    
     def _init_schema(self):
         """Create database tables if they don't exist"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         # Leads table
@@ -47,6 +106,11 @@ class Database:
                 website TEXT,
                 email TEXT,
                 
+                -- Email verification (see EMAIL_VERIFICATION_COLUMNS)
+                email_status TEXT,
+                email_score INTEGER,
+                email_verified_at TEXT,
+                
                 -- Social & reputation
                 rating REAL,
                 review_count INTEGER,
@@ -114,15 +178,313 @@ class Database:
             )
         ''')
         
+        # Lead -> CRM record mapping, so syncs skip CRM search calls
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS crm_links (
+                lead_id INTEGER NOT NULL,
+                crm TEXT NOT NULL DEFAULT 'hubspot',
+                contact_id TEXT NOT NULL,
+                email TEXT,
+                sync_hash TEXT,
+                synced_at TEXT,
+                PRIMARY KEY (lead_id, crm),
+                FOREIGN KEY (lead_id) REFERENCES leads (id)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_crm_links_email ON crm_links(crm, email)')
+        
+        # Columns added after the table was first created
+        self._migrate_schema(cursor)
+        
         # Create indexes for performance
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_status ON leads(status)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_score ON leads(ai_lead_score)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_city ON leads(city)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_category ON leads(category)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_place_id ON leads(place_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_status_email_status ON leads(status, email_status)')
+        
+        # Composite indexes for keyset pagination (see SORT_KEYS)
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_score_id ON leads(IFNULL(ai_lead_score, -1), id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_status_score_id ON leads(status, IFNULL(ai_lead_score, -1), id)')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_created_id ON leads(IFNULL(created_at, ''), id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_status_created_id ON leads(status, IFNULL(created_at, ''), id)")
+        
+        # Full-text search index
+        self.fts_enabled = self._init_search_index(cursor)
+        
+        # Aggregates for get_stats
+        self._init_stats_tables(cursor)
         
         conn.commit()
-        conn.close()
+    
+    # Email verification results: email_status is 'deliverable', 'risky',
+    # 'undeliverable', 'unknown' or 'invalid' (NULL = not verified yet)
+    EMAIL_VERIFICATION_COLUMNS = (
+        ('email_status', 'TEXT'),
+        ('email_score', 'INTEGER'),
+        ('email_verified_at', 'TEXT'),
+    )
+    
+    def _migrate_schema(self, cursor: sqlite3.Cursor):
+        """Add columns missing from a leads table created by an older version"""
+        cursor.execute('PRAGMA table_info(leads)')
+        existing = {row['name'] for row in cursor.fetchall()}
+        
+        for column, column_type in self.EMAIL_VERIFICATION_COLUMNS:
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE leads ADD COLUMN {column} {column_type}')
+    
+    def _init_search_index(self, cursor: sqlite3.Cursor) -> bool:
+        """
+        Create the FTS5 search index and its sync triggers
+        
+        The index is an external-content table over leads, so it stores
+        only the token index. Existing rows are backfilled the first time
+        the index is created.
+        
+        Returns:
+            True if FTS5 is available, False to fall back to LIKE search
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'leads_fts'")
+        exists = cursor.fetchone() is not None
+        
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5(
+                    name, category, city, state, ai_insights,
+                    content='leads',
+                    content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"⚠️  FTS5 unavailable, using LIKE search: {e}")
+            return False
+        
+        # Keep the index in sync with leads
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS leads_fts_insert AFTER INSERT ON leads BEGIN
+                INSERT INTO leads_fts (rowid, name, category, city, state, ai_insights)
+                VALUES (new.id, new.name, new.category, new.city, new.state, new.ai_insights);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS leads_fts_delete AFTER DELETE ON leads BEGIN
+                INSERT INTO leads_fts (leads_fts, rowid, name, category, city, state, ai_insights)
+                VALUES ('delete', old.id, old.name, old.category, old.city, old.state, old.ai_insights);
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS leads_fts_update
+            AFTER UPDATE OF name, category, city, state, ai_insights ON leads BEGIN
+                INSERT INTO leads_fts (leads_fts, rowid, name, category, city, state, ai_insights)
+                VALUES ('delete', old.id, old.name, old.category, old.city, old.state, old.ai_insights);
+                INSERT INTO leads_fts (rowid, name, category, city, state, ai_insights)
+                VALUES (new.id, new.name, new.category, new.city, new.state, new.ai_insights);
+            END
+        ''')
+        
+        # Backfill rows saved before the index existed
+        if not exists:
+            cursor.execute("INSERT INTO leads_fts (leads_fts) VALUES ('rebuild')")
+        
+        return True
+    
+    # Dimensions counted in lead_stats (leads column per dimension)
+    STATS_DIMENSIONS = ('status', 'city', 'category')
+    
+    # Leads without a status are counted under this by_status key; NULL
+    # cities and categories are left out of the top lists
+    NULL_STATUS = 'unknown'
+    
+    def _stats_value_sql(self, dim: str, row: Optional[str] = None) -> str:
+        """SQL for the lead_stats value a lead row has in a dimension"""
+        column = f"{row}.{dim}" if row else dim
+        if dim == 'status':
+            return f"IFNULL({column}, '{self.NULL_STATUS}')"
+        return column
+    
+    def _stats_delta_sql(self, row: str, sign: str) -> str:
+        """Trigger statement adding (+) or removing (-) one lead row from lead_stats"""
+        dims = ', '.join(
+            f"('{dim}', {self._stats_value_sql(dim, row)}, 0, 0)" for dim in self.STATS_DIMENSIONS
+        )
+        # Remaining NULL values are not counted (matches the GROUP BY in _rebuild_stats)
+        return f'''
+                INSERT INTO lead_stats (dimension, value, lead_count, score_sum, score_count)
+                SELECT column1, column2, {sign}1, column3, column4 FROM (VALUES
+                    ('total', '', {sign}IFNULL({row}.ai_lead_score, 0), {sign}({row}.ai_lead_score IS NOT NULL)),
+                    {dims}
+                )
+                WHERE column2 IS NOT NULL
+                ON CONFLICT (dimension, value) DO UPDATE SET
+                    lead_count = lead_count + excluded.lead_count,
+                    score_sum = score_sum + excluded.score_sum,
+                    score_count = score_count + excluded.score_count;'''
+    
+    def _init_stats_tables(self, cursor: sqlite3.Cursor):
+        """
+        Create the lead_stats summary table and the triggers maintaining it
+        
+        lead_stats holds one row per (dimension, value) with its lead count,
+        plus a ('total', '') row carrying the overall count and score
+        sum/count, so get_stats reads a handful of rows instead of
+        aggregating the leads table.
+        """
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lead_stats'")
+        exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lead_stats (
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                lead_count INTEGER NOT NULL DEFAULT 0,
+                score_sum REAL NOT NULL DEFAULT 0,
+                score_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (dimension, value)
+            )
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_lead_stats_count ON lead_stats(dimension, lead_count)')
+        
+        # Recreated every time so databases pick up changes to the trigger SQL
+        for trigger in ('lead_stats_insert', 'lead_stats_delete', 'lead_stats_update'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS lead_stats_insert AFTER INSERT ON leads BEGIN
+                {self._stats_delta_sql('new', '+')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS lead_stats_delete AFTER DELETE ON leads BEGIN
+                {self._stats_delta_sql('old', '-')}
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS lead_stats_update
+            AFTER UPDATE OF status, city, category, ai_lead_score ON leads BEGIN
+                {self._stats_delta_sql('old', '-')}
+                {self._stats_delta_sql('new', '+')}
+            END
+        ''')
+        
+        # Backfill counts for rows saved before the table existed, or before
+        # leads without a status were counted (status counts must add up)
+        if not exists or not self._status_stats_complete(cursor):
+            self._rebuild_stats(cursor)
+    
+    def _status_stats_complete(self, cursor: sqlite3.Cursor) -> bool:
+        """Check that the per-status counts add up to the total"""
+        cursor.execute('''
+            SELECT
+                (SELECT IFNULL(SUM(lead_count), 0) FROM lead_stats WHERE dimension = 'status'),
+                (SELECT IFNULL(SUM(lead_count), 0) FROM lead_stats WHERE dimension = 'total')
+        ''')
+        status_count, total = cursor.fetchone()
+        return status_count == total
+    
+    def _rebuild_stats(self, cursor: sqlite3.Cursor):
+        """Recompute lead_stats from the leads table"""
+        cursor.execute('DELETE FROM lead_stats')
+        cursor.execute('''
+            INSERT INTO lead_stats (dimension, value, lead_count, score_sum, score_count)
+            SELECT 'total', '', COUNT(*), IFNULL(SUM(ai_lead_score), 0), COUNT(ai_lead_score) FROM leads
+        ''')
+        for dim in self.STATS_DIMENSIONS:
+            value = self._stats_value_sql(dim)
+            cursor.execute(f'''
+                INSERT INTO lead_stats (dimension, value, lead_count)
+                SELECT '{dim}', {value}, COUNT(*) FROM leads
+                WHERE {value} IS NOT NULL
+                GROUP BY {value}
+            ''')
+    
+    def rebuild_stats(self):
+        """Repair lead_stats by recomputing it from the leads table"""
+        conn = self._get_connection()
+        with conn:
+            cursor = conn.cursor()
+            # Hold the write lock so no insert lands between delete and refill
+            cursor.execute('BEGIN IMMEDIATE')
+            self._rebuild_stats(cursor)
+    
+    def rebuild_search_index(self):
+        """Rebuild the full-text search index from the leads table"""
+        if not self.fts_enabled:
+            return
+        
+        conn = self._get_connection()
+        with conn:
+            conn.execute("INSERT INTO leads_fts (leads_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO leads_fts (leads_fts) VALUES ('optimize')")
+    
+    # Columns written by save_lead/save_leads, in parameter order
+    LEAD_COLUMNS = (
+        'name', 'category', 'address', 'city', 'state', 'postal_code', 'country',
+        'phone', 'website', 'email',
+        'rating', 'review_count', 'google_maps_url', 'place_id',
+        'is_claimed', 'is_open', 'price_level',
+        'ai_lead_score', 'ai_insights', 'ai_concerns', 'recommended_services', 'ai_outreach_message',
+        'status', 'source', 'scraped_at', 'last_updated', 'search_text'
+    )
+    
+    # Columns refreshed when an existing place_id is re-saved with update_existing
+    UPSERT_COLUMNS = (
+        'name', 'category', 'address', 'city', 'state', 'postal_code', 'country',
+        'phone', 'website', 'email',
+        'rating', 'review_count', 'google_maps_url',
+        'is_claimed', 'is_open', 'price_level',
+        'ai_lead_score', 'ai_insights', 'ai_concerns', 'recommended_services', 'ai_outreach_message',
+        'scraped_at', 'search_text'
+    )
+    
+    # SQLite's default host parameter limit is 999; stay well under it
+    MAX_SQL_PARAMS = 500
+    
+    def _lead_params(self, lead: Dict, status: str, timestamp: str) -> tuple:
+        """Build INSERT parameters for a lead in LEAD_COLUMNS order"""
+        # Create search text for full-text search
+        search_text = f"{lead.get('name', '')} {lead.get('category', '')} {lead.get('city', '')} {lead.get('state', '')}"
+        
+        return (
+            lead.get('name'),
+            lead.get('category'),
+            lead.get('address'),
+            lead.get('city'),
+            lead.get('state'),
+            lead.get('postal_code'),
+            lead.get('country', 'US'),
+            lead.get('phone'),
+            lead.get('website'),
+            lead.get('email'),
+            lead.get('rating'),
+            lead.get('review_count'),
+            lead.get('google_maps_url'),
+            lead.get('place_id') or None,  # empty ids must not collide on UNIQUE
+            lead.get('is_claimed'),
+            lead.get('is_open'),
+            lead.get('price_level'),
+            lead.get('ai_lead_score'),
+            lead.get('ai_insights'),
+            lead.get('ai_concerns'),
+            lead.get('recommended_services'),
+            lead.get('ai_outreach_message'),
+            status,
+            lead.get('source', 'google_maps'),
+            lead.get('scraped_at'),
+            timestamp,
+            search_text
+        )
+    
+    def _get_ids_by_place_id(self, cursor: sqlite3.Cursor, place_ids: List[str]) -> Dict[str, int]:
+        """Map place_ids to lead IDs, chunked to respect the SQL parameter limit"""
+        ids = {}
+        for i in range(0, len(place_ids), self.MAX_SQL_PARAMS):
+            chunk = place_ids[i:i + self.MAX_SQL_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f'SELECT id, place_id FROM leads WHERE place_id IN ({placeholders})', chunk)
+            ids.update({row['place_id']: row['id'] for row in cursor.fetchall()})
+        return ids
     
     def save_lead(self, lead: Dict) -> Optional[int]:
         """
@@ -134,69 +496,111 @@ class Database:
         Returns:
             Lead ID if successful, None if duplicate
         """
+        result = self.save_leads([lead])[0]
+        return result['id'] if result['outcome'] == 'inserted' else None
+    
+    def save_leads(
+        self,
+        leads: List[Dict],
+        update_existing: bool = False,
+        qualify_min_score: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Save a batch of leads in a single transaction
+        
+        Leads are upserted on place_id with one executemany call, so a whole
+        pipeline run costs one commit. Qualification is decided up front and
+        written as part of the same INSERT.
+        
+        Args:
+            leads: Lead dictionaries
+            update_existing: Refresh enrichment fields of leads whose place_id
+                already exists (otherwise they are skipped as duplicates)
+            qualify_min_score: If set, new leads scoring at least this much are
+                saved with status 'qualified'
+        
+        Returns:
+            One result per input lead, in order:
+            {'id': lead ID or None, 'outcome': 'inserted' | 'duplicate' | 'updated' | 'error',
+             'status': status written for inserted leads, otherwise None}
+        """
+        if not leads:
+            return []
+        
+        timestamp = datetime.now().isoformat()
+        
+        statuses = []
+        for lead in leads:
+            status = lead.get('status', 'new')
+            if qualify_min_score is not None and (lead.get('ai_lead_score') or 0) >= qualify_min_score:
+                status = 'qualified'
+            statuses.append(status)
+        
+        columns = ', '.join(self.LEAD_COLUMNS)
+        placeholders = ', '.join('?' * len(self.LEAD_COLUMNS))
+        if update_existing:
+            assignments = ', '.join(f'{col} = COALESCE(excluded.{col}, leads.{col})' for col in self.UPSERT_COLUMNS)
+            # A changed email address invalidates its verification
+            reverify = ', '.join(
+                f'{col} = CASE WHEN excluded.email IS NULL OR excluded.email = leads.email THEN leads.{col} END'
+                for col, _ in self.EMAIL_VERIFICATION_COLUMNS
+            )
+            conflict = f'''DO UPDATE SET {assignments}, {reverify},
+                    status = CASE WHEN leads.status = 'new' THEN excluded.status ELSE leads.status END,
+                    last_updated = excluded.last_updated'''
+        else:
+            conflict = 'DO NOTHING'
+        upsert_sql = f'INSERT INTO leads ({columns}) VALUES ({placeholders}) ON CONFLICT(place_id) {conflict}'
+        insert_sql = f'INSERT INTO leads ({columns}) VALUES ({placeholders})'
+        
+        conn = self._get_connection()
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            # Check for duplicate by place_id
-            if lead.get('place_id'):
-                cursor.execute('SELECT id FROM leads WHERE place_id = ?', (lead['place_id'],))
-                if cursor.fetchone():
-                    conn.close()
-                    return None  # Duplicate
+            # Take the write lock up front so the duplicate check and the
+            # upsert see the same snapshot across processes
+            cursor.execute('BEGIN IMMEDIATE')
             
-            # Create search text for full-text search
-            search_text = f"{lead.get('name', '')} {lead.get('category', '')} {lead.get('city', '')} {lead.get('state', '')}"
+            place_ids = list({lead['place_id'] for lead in leads if lead.get('place_id') and lead.get('name')})
+            existing = self._get_ids_by_place_id(cursor, place_ids)
             
-            # Insert lead
-            cursor.execute('''
-                INSERT INTO leads (
-                    name, category, address, city, state, postal_code, country,
-                    phone, website, email,
-                    rating, review_count, google_maps_url, place_id,
-                    is_claimed, is_open, price_level,
-                    ai_lead_score, ai_insights, ai_concerns, recommended_services, ai_outreach_message,
-                    status, source, scraped_at, last_updated, search_text
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                lead.get('name'),
-                lead.get('category'),
-                lead.get('address'),
-                lead.get('city'),
-                lead.get('state'),
-                lead.get('postal_code'),
-                lead.get('country', 'US'),
-                lead.get('phone'),
-                lead.get('website'),
-                lead.get('email'),
-                lead.get('rating'),
-                lead.get('review_count'),
-                lead.get('google_maps_url'),
-                lead.get('place_id'),
-                lead.get('is_claimed'),
-                lead.get('is_open'),
-                lead.get('price_level'),
-                lead.get('ai_lead_score'),
-                lead.get('ai_insights'),
-                lead.get('ai_concerns'),
-                lead.get('recommended_services'),
-                lead.get('ai_outreach_message'),
-                lead.get('status', 'new'),
-                lead.get('source', 'google_maps'),
-                lead.get('scraped_at'),
-                datetime.now().isoformat(),
-                search_text
-            ))
+            results = []
+            seen = set(existing)
+            upsert_rows = []
+            for lead, status in zip(leads, statuses):
+                place_id = lead.get('place_id')
+                result = {'id': None, 'outcome': 'inserted', 'status': status}
+                
+                if not lead.get('name'):
+                    # Would violate NOT NULL and abort the whole batch
+                    result.update(outcome='error', status=None)
+                elif place_id:
+                    if place_id in seen:
+                        result['outcome'] = 'updated' if update_existing else 'duplicate'
+                        result['status'] = None
+                    seen.add(place_id)
+                    upsert_rows.append(self._lead_params(lead, status, timestamp))
+                else:
+                    # No natural key: plain insert, nothing to conflict with
+                    cursor.execute(insert_sql, self._lead_params(lead, status, timestamp))
+                    result['id'] = cursor.lastrowid
+                
+                results.append(result)
             
-            lead_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            if upsert_rows:
+                cursor.executemany(upsert_sql, upsert_rows)
+                ids = self._get_ids_by_place_id(cursor, place_ids)
+                for lead, result in zip(leads, results):
+                    if lead.get('place_id') and result['outcome'] != 'error':
+                        result['id'] = ids.get(lead['place_id'])
             
-            return lead_id
+            conn.commit()
+            return results
             
         except Exception as e:
+            conn.rollback()
             print(f"❌ Database error: {e}")
-            return None
+            return [{'id': None, 'outcome': 'error', 'status': None} for _ in leads]
     
     def get_leads(
         self,
@@ -221,37 +625,195 @@ class Database:
         Returns:
             List of lead dictionaries
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         # Build query
-        query = 'SELECT * FROM leads WHERE 1=1'
+        where, params = self._build_filters(status, min_score, city)
+        query = f'SELECT * FROM leads WHERE {where} ORDER BY {order_by} LIMIT ? OFFSET ?'
+        params.extend([limit, offset])
+        
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+        
+        # Convert to dictionaries
+        leads = [dict(row) for row in rows]
+        
+        return leads
+    
+    def _build_filters(
+        self,
+        status: Optional[str] = None,
+        min_score: Optional[int] = None,
+        city: Optional[str] = None
+    ) -> tuple:
+        """Build the shared WHERE clause and parameters for lead listings"""
+        where = '1=1'
         params = []
         
         if status:
-            query += ' AND status = ?'
+            where += ' AND status = ?'
             params.append(status)
         
         if min_score:
-            query += ' AND ai_lead_score >= ?'
+            where += ' AND ai_lead_score >= ?'
             params.append(min_score)
         
         if city:
-            query += ' AND city LIKE ?'
+            where += ' AND city LIKE ?'
             params.append(f'%{city}%')
         
-        query += f' ORDER BY {order_by} LIMIT ? OFFSET ?'
-        params.extend([limit, offset])
+        return where, params
+    
+    # Keyset sort orders (always descending, id breaks ties). The
+    # expressions must match the composite indexes created in _init_schema.
+    SORT_KEYS = {
+        'score': 'IFNULL(ai_lead_score, -1)',
+        'created': "IFNULL(created_at, '')",
+    }
+    
+    # Types a cursor's sort key may have, per sort order
+    SORT_KEY_TYPES = {
+        'score': (int, float),
+        'created': (str,),
+    }
+    
+    def _encode_cursor(self, sort: str, key, lead_id: int) -> str:
+        """Encode the last row of a page as an opaque cursor token"""
+        payload = json.dumps([sort, key, lead_id], separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+    
+    def _decode_cursor(self, token: str) -> tuple:
+        """Decode a cursor token into (sort, key, lead_id)"""
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            sort, key, lead_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if sort not in self.SORT_KEYS or not isinstance(lead_id, int) or isinstance(lead_id, bool):
+                raise ValueError
+            if not isinstance(key, self.SORT_KEY_TYPES[sort]) or isinstance(key, bool):
+                raise ValueError
+            return sort, key, lead_id
+        except Exception:
+            raise ValueError("Invalid cursor")
+    
+    def get_leads_page(
+        self,
+        status: Optional[str] = None,
+        min_score: Optional[int] = None,
+        city: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        sort: str = 'score'
+    ) -> Dict:
+        """
+        Get one page of leads using keyset (cursor) pagination
         
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
+        Each page seeks directly to the previous page's last (sort key, id)
+        through a composite index, so deep pages cost the same as page one.
         
-        # Convert to dictionaries
-        leads = [dict(row) for row in rows]
+        Args:
+            status: Filter by status (new, qualified, contacted, converted, rejected)
+            min_score: Minimum AI lead score
+            city: Filter by city
+            limit: Maximum results
+            cursor: next_cursor from the previous page (None for the first page)
+            sort: 'score' (highest AI score first) or 'created' (newest first)
         
-        conn.close()
-        return leads
+        Returns:
+            {'leads': [...], 'next_cursor': token or None when there are no more pages}
+        
+        Raises:
+            ValueError: Unknown sort or invalid/mismatched cursor
+        """
+        if sort not in self.SORT_KEYS:
+            raise ValueError(f"Invalid sort. Must be one of: {list(self.SORT_KEYS)}")
+        sort_expr = self.SORT_KEYS[sort]
+        
+        where, params = self._build_filters(status, min_score, city)
+        select = f'SELECT *, {sort_expr} AS sort_key FROM leads'
+        
+        # Fetch one extra row to learn whether another page exists
+        if cursor:
+            cursor_sort, key, last_id = self._decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValueError("Cursor was issued for a different sort order")
+            
+            # Rest of the current sort key, then everything below it. Split
+            # into two halves because SQLite can't seek an index on a
+            # row-value comparison over an expression; each half is an
+            # index range seek and the merge sorts at most 2 * limit rows.
+            query = f'''
+                SELECT * FROM (
+                    {select} WHERE {where} AND {sort_expr} = ? AND id < ?
+                    ORDER BY id DESC LIMIT ?
+                )
+                UNION ALL
+                SELECT * FROM (
+                    {select} WHERE {where} AND {sort_expr} < ?
+                    ORDER BY {sort_expr} DESC, id DESC LIMIT ?
+                )
+                ORDER BY sort_key DESC, id DESC
+                LIMIT ?
+            '''
+            params = params + [key, last_id, limit + 1] + params + [key, limit + 1, limit + 1]
+        else:
+            query = f'{select} WHERE {where} ORDER BY {sort_expr} DESC, id DESC LIMIT ?'
+            params.append(limit + 1)
+        
+        conn = self._get_connection()
+        rows = conn.execute(query, params).fetchall()
+        
+        leads = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = leads[-1]
+            next_cursor = self._encode_cursor(sort, last['sort_key'], last['id'])
+        
+        for lead in leads:
+            del lead['sort_key']
+        
+        return {'leads': leads, 'next_cursor': next_cursor}
+    
+    def get_lead(self, lead_id: int) -> Optional[Dict]:
+        """
+        Get a single lead by ID
+        
+        Args:
+            lead_id: Lead ID
+        
+        Returns:
+            Lead dictionary or None if not found
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('SELECT * FROM leads WHERE id = ?', (lead_id,))
+        row = cursor.fetchone()
+        
+        return dict(row) if row else None
+    
+    def get_leads_by_ids(self, lead_ids: List[int]) -> List[Dict]:
+        """
+        Get several leads by ID in one round trip per chunk
+        
+        Args:
+            lead_ids: Lead IDs
+        
+        Returns:
+            Lead dictionaries in the order of lead_ids (missing IDs are skipped)
+        """
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        
+        unique_ids = list(dict.fromkeys(lead_ids))
+        found = {}
+        for i in range(0, len(unique_ids), self.MAX_SQL_PARAMS):
+            chunk = unique_ids[i:i + self.MAX_SQL_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            cursor.execute(f'SELECT * FROM leads WHERE id IN ({placeholders})', chunk)
+            found.update({row['id']: dict(row) for row in cursor.fetchall()})
+        
+        return [found[lead_id] for lead_id in lead_ids if lead_id in found]
     
     def update_lead_status(self, lead_id: int, status: str, notes: Optional[str] = None):
         """
@@ -262,24 +824,177 @@ class Database:
             status: New status (new, qualified, contacted, converted, rejected)
             notes: Optional notes about status change
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE leads 
-            SET status = ?, last_updated = ?, notes = COALESCE(notes || ' | ' || ?, notes, ?)
-            WHERE id = ?
-        ''', (status, datetime.now().isoformat(), notes, notes, lead_id))
+        conn = self._get_connection()
         
-        # Log interaction
-        if notes:
+        # Commit on success, roll back on error so the pooled
+        # connection is never left inside an open transaction
+        with conn:
+            cursor = conn.cursor()
+            
             cursor.execute('''
-                INSERT INTO interactions (lead_id, interaction_type, interaction_date, notes)
-                VALUES (?, ?, ?, ?)
-            ''', (lead_id, 'status_change', datetime.now().isoformat(), f"Changed to {status}: {notes}"))
+                UPDATE leads 
+                SET status = ?, last_updated = ?, notes = COALESCE(notes || ' | ' || ?, notes, ?)
+                WHERE id = ?
+            ''', (status, datetime.now().isoformat(), notes, notes, lead_id))
+            
+            # Log interaction
+            if notes:
+                cursor.execute('''
+                    INSERT INTO interactions (lead_id, interaction_type, interaction_date, notes)
+                    VALUES (?, ?, ?, ?)
+                ''', (lead_id, 'status_change', datetime.now().isoformat(), f"Changed to {status}: {notes}"))
+    
+    def get_unverified_emails(
+        self,
+        status: Optional[str] = 'qualified',
+        min_score: Optional[int] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Get leads whose email address has not been verified yet
         
-        conn.commit()
-        conn.close()
+        Args:
+            status: Filter by status (None for all)
+            min_score: Minimum AI lead score
+            limit: Maximum results (None for all)
+        
+        Returns:
+            Dicts with id, name and email, highest score first
+        """
+        where, params = self._build_filters(status, min_score)
+        query = f'''
+            SELECT id, name, email FROM leads
+            WHERE {where} AND email IS NOT NULL AND email != '' AND email_status IS NULL
+            ORDER BY {self.STREAM_ORDER}
+        '''
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        
+        conn = self._get_connection()
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+    
+    def save_email_verifications(self, verifications: List[Dict]) -> int:
+        """
+        Store email verification results in one transaction
+        
+        A result is only written if the lead still has the address that was
+        verified.
+        
+        Args:
+            verifications: Dicts with id, email, email_status and email_score
+        
+        Returns:
+            Number of leads updated
+        """
+        if not verifications:
+            return 0
+        
+        timestamp = datetime.now().isoformat()
+        conn = self._get_connection()
+        with conn:
+            cursor = conn.executemany('''
+                UPDATE leads
+                SET email_status = ?, email_score = ?, email_verified_at = ?
+                WHERE id = ? AND email = ?
+            ''', [
+                (v['email_status'], v.get('email_score'), timestamp, v['id'], v['email'])
+                for v in verifications
+            ])
+        return cursor.rowcount
+    
+    def get_crm_links(self, lead_ids: List[int], crm: str = 'hubspot') -> Dict[int, Dict]:
+        """
+        Get the CRM records leads were last synced to
+        
+        Args:
+            lead_ids: Lead IDs
+            crm: CRM name
+        
+        Returns:
+            Lead ID -> {'contact_id', 'email', 'sync_hash', 'synced_at'}
+        """
+        conn = self._get_connection()
+        unique_ids = list(dict.fromkeys(lead_ids))
+        links = {}
+        for i in range(0, len(unique_ids), self.MAX_SQL_PARAMS):
+            chunk = unique_ids[i:i + self.MAX_SQL_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = conn.execute(f'''
+                SELECT lead_id, contact_id, email, sync_hash, synced_at FROM crm_links
+                WHERE crm = ? AND lead_id IN ({placeholders})
+            ''', [crm, *chunk]).fetchall()
+            links.update({row['lead_id']: dict(row) for row in rows})
+        return links
+    
+    def get_crm_links_by_email(self, emails: List[str], crm: str = 'hubspot') -> Dict[str, str]:
+        """
+        Get CRM record IDs already linked to email addresses
+        
+        Args:
+            emails: Lowercased email addresses
+            crm: CRM name
+        
+        Returns:
+            Email -> CRM record ID
+        """
+        conn = self._get_connection()
+        unique_emails = list(dict.fromkeys(emails))
+        found = {}
+        for i in range(0, len(unique_emails), self.MAX_SQL_PARAMS):
+            chunk = unique_emails[i:i + self.MAX_SQL_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = conn.execute(f'''
+                SELECT email, contact_id FROM crm_links
+                WHERE crm = ? AND email IN ({placeholders})
+            ''', [crm, *chunk]).fetchall()
+            found.update({row['email']: row['contact_id'] for row in rows})
+        return found
+    
+    def save_crm_links(self, links: List[Dict], crm: str = 'hubspot'):
+        """
+        Record the CRM records leads were synced to
+        
+        Args:
+            links: Dicts with lead_id, contact_id, email and sync_hash
+            crm: CRM name
+        """
+        if not links:
+            return
+        
+        timestamp = datetime.now().isoformat()
+        conn = self._get_connection()
+        with conn:
+            conn.executemany('''
+                INSERT INTO crm_links (lead_id, crm, contact_id, email, sync_hash, synced_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(lead_id, crm) DO UPDATE SET
+                    contact_id = excluded.contact_id,
+                    email = excluded.email,
+                    sync_hash = excluded.sync_hash,
+                    synced_at = excluded.synced_at
+            ''', [
+                (link['lead_id'], crm, link['contact_id'], link.get('email'), link.get('sync_hash'), timestamp)
+                for link in links
+            ])
+    
+    def delete_crm_links(self, lead_ids: List[int], crm: str = 'hubspot'):
+        """
+        Forget CRM links (e.g. the CRM record no longer exists)
+        
+        Args:
+            lead_ids: Lead IDs
+            crm: CRM name
+        """
+        if not lead_ids:
+            return
+        
+        conn = self._get_connection()
+        with conn:
+            conn.executemany(
+                'DELETE FROM crm_links WHERE lead_id = ? AND crm = ?',
+                [(lead_id, crm) for lead_id in lead_ids]
+            )
     
     def add_interaction(self, lead_id: int, interaction_type: str, notes: str, outcome: Optional[str] = None):
         """
@@ -291,21 +1006,20 @@ class Database:
             notes: Interaction notes
             outcome: Outcome (interested, not_interested, callback, etc.)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO interactions (lead_id, interaction_type, interaction_date, notes, outcome)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (lead_id, interaction_type, datetime.now().isoformat(), notes, outcome))
-        
-        # Update last_contacted
-        cursor.execute('''
-            UPDATE leads SET last_contacted = ? WHERE id = ?
-        ''', (datetime.now().isoformat(), lead_id))
+        conn = self._get_connection()
         
-        conn.commit()
-        conn.close()
+        with conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO interactions (lead_id, interaction_type, interaction_date, notes, outcome)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (lead_id, interaction_type, datetime.now().isoformat(), notes, outcome))
+            
+            # Update last_contacted
+            cursor.execute('''
+                UPDATE leads SET last_contacted = ? WHERE id = ?
+            ''', (datetime.now().isoformat(), lead_id))
     
     def get_stats(self) -> Dict:
         """
@@ -314,37 +1028,66 @@ class Database:
         Returns:
             Statistics dictionary
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self._get_connection()
         cursor = conn.cursor()
         
         stats = {}
         
-        # Total leads
-        cursor.execute('SELECT COUNT(*) FROM leads')
-        stats['total_leads'] = cursor.fetchone()[0]
+        # Total leads and average score
+        cursor.execute("SELECT lead_count, score_sum, score_count FROM lead_stats WHERE dimension = 'total'")
+        row = cursor.fetchone()
+        stats['total_leads'] = row['lead_count'] if row else 0
         
-        # By status
-        cursor.execute('SELECT status, COUNT(*) FROM leads GROUP BY status')
+        # By status (leads without one under NULL_STATUS)
+        cursor.execute("SELECT value, lead_count FROM lead_stats WHERE dimension = 'status' AND lead_count > 0")
         stats['by_status'] = dict(cursor.fetchall())
         
         # Average score
-        cursor.execute('SELECT AVG(ai_lead_score) FROM leads WHERE ai_lead_score IS NOT NULL')
-        stats['avg_score'] = round(cursor.fetchone()[0] or 0, 1)
+        stats['avg_score'] = round(row['score_sum'] / row['score_count'], 1) if row and row['score_count'] else 0
         
         # Top cities
-        cursor.execute('SELECT city, COUNT(*) FROM leads WHERE city IS NOT NULL GROUP BY city ORDER BY COUNT(*) DESC LIMIT 5')
+        cursor.execute('''
+            SELECT value, lead_count FROM lead_stats
+            WHERE dimension = 'city' AND lead_count > 0
+            ORDER BY lead_count DESC LIMIT 5
+        ''')
         stats['top_cities'] = dict(cursor.fetchall())
         
         # Top categories
-        cursor.execute('SELECT category, COUNT(*) FROM leads WHERE category IS NOT NULL GROUP BY category ORDER BY COUNT(*) DESC LIMIT 5')
+        cursor.execute('''
+            SELECT value, lead_count FROM lead_stats
+            WHERE dimension = 'category' AND lead_count > 0
+            ORDER BY lead_count DESC LIMIT 5
+        ''')
         stats['top_categories'] = dict(cursor.fetchall())
         
-        conn.close()
         return stats
     
+    # bm25 column weights: name, category, city, state, ai_insights
+    SEARCH_WEIGHTS = (10.0, 5.0, 3.0, 2.0, 1.0)
+    
+    def _build_match_query(self, search_term: str) -> Optional[str]:
+        """
+        Convert free text into an FTS5 MATCH expression
+        
+        Every word must match, and the last word also matches as a prefix
+        so "bost" finds "Boston". Words are quoted so FTS5 operators in
+        user input are treated as plain text.
+        """
+        words = re.findall(r'\w+', search_term)
+        if not words:
+            return None
+        
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += '*'
+        return ' '.join(terms)
+    
     def search_leads(self, search_term: str, limit: int = 50) -> List[Dict]:
         """
-        Search leads by name, category, or location
+        Search leads by name, category, location, or AI insights
+        
+        Results are ranked by bm25 relevance and include a 'rank' (lower is
+        more relevant) and a highlighted 'snippet' of the matching text.
         
         Args:
             search_term: Search term
@@ -353,23 +1096,112 @@ class Database:
         Returns:
             List of matching leads
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._get_connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT * FROM leads 
-            WHERE search_text LIKE ?
-            ORDER BY ai_lead_score DESC
+        if not self.fts_enabled:
+            cursor.execute('''
+                SELECT * FROM leads 
+                WHERE search_text LIKE ?
+                ORDER BY ai_lead_score DESC
+                LIMIT ?
+            ''', (f'%{search_term}%', limit))
+            return [dict(row) for row in cursor.fetchall()]
+        
+        match_query = self._build_match_query(search_term)
+        if not match_query:
+            return []
+        
+        weights = ', '.join(str(w) for w in self.SEARCH_WEIGHTS)
+        cursor.execute(f'''
+            SELECT leads.*,
+                   bm25(leads_fts, {weights}) AS rank,
+                   snippet(leads_fts, -1, '<mark>', '</mark>', '…', 12) AS snippet
+            FROM leads_fts
+            JOIN leads ON leads.id = leads_fts.rowid
+            WHERE leads_fts MATCH ?
+            ORDER BY rank, leads.ai_lead_score DESC
             LIMIT ?
-        ''', (f'%{search_term}%', limit))
+        ''', (match_query, limit))
         
         leads = [dict(row) for row in cursor.fetchall()]
         
-        conn.close()
         return leads
     
-    def export_leads(self, status: Optional[str] = None) -> List[Dict]:
+    # Streaming order: matches the keyset indexes so SQLite walks an index
+    # in order instead of sorting the whole result set before the first row
+    STREAM_ORDER = 'IFNULL(ai_lead_score, -1) DESC, id DESC'
+    
+    def iter_lead_batches(
+        self,
+        status: Optional[str] = None,
+        min_score: Optional[int] = None,
+        city: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[List[Dict]]:
+        """
+        Stream matching leads in batches from a server-side cursor
+        
+        Uses its own connection (a consistent WAL read snapshot) so memory
+        stays flat regardless of table size and the caller's pooled
+        connection remains free for writes while iterating.
+        
+        Args:
+            status: Filter by status (new, qualified, contacted, converted, rejected)
+            min_score: Minimum AI lead score
+            city: Filter by city
+            batch_size: Rows fetched per round trip
+        
+        Yields:
+            Lists of up to batch_size lead dictionaries, highest score first
+        """
+        where, params = self._build_filters(status, min_score, city)
+        
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f'SELECT * FROM leads WHERE {where} ORDER BY {self.STREAM_ORDER}', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            conn.close()
+    
+    def iter_leads(
+        self,
+        status: Optional[str] = None,
+        min_score: Optional[int] = None,
+        city: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[Dict]:
+        """
+        Stream matching leads one at a time (see iter_lead_batches)
+        
+        Yields:
+            Lead dictionaries, highest score first
+        """
+        for batch in self.iter_lead_batches(status, min_score, city, batch_size):
+            yield from batch
+    
+    def count_leads(
+        self,
+        status: Optional[str] = None,
+        min_score: Optional[int] = None,
+        city: Optional[str] = None
+    ) -> int:
+        """
+        Count leads matching the get_leads filters
+        
+        Returns:
+            Number of matching leads
+        """
+        where, params = self._build_filters(status, min_score, city)
+        
+        conn = self._get_connection()
+        return conn.execute(f'SELECT COUNT(*) FROM leads WHERE {where}', params).fetchone()[0]
+    
+    def export_leads(self, status: Optional[str] = None) -> Iterator[Dict]:
         """
         Export all leads for a given status
         
@@ -377,13 +1209,27 @@ class Database:
             status: Filter by status (or None for all)
         
         Returns:
-            List of all matching leads
+            Iterator over all matching leads (streamed, not materialized)
         """
-        return self.get_leads(status=status, limit=100000)
+        return self.iter_leads(status=status)
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Eleven Views lead database')
+    parser.add_argument('--rebuild-search', action='store_true', help='Rebuild the full-text search index')
+    parser.add_argument('--rebuild-stats', action='store_true', help='Recompute the lead_stats summary table')
+    args = parser.parse_args()
+    
     # Test database
     db = Database()
     print("✅ Database initialized")
+    
+    if args.rebuild_search:
+        db.rebuild_search_index()
+        print("🔎 Search index rebuilt")
+    
+    if args.rebuild_stats:
+        db.rebuild_stats()
+        print("📈 Stats rebuilt")
+    
     print(f"📊 Stats: {db.get_stats()}")
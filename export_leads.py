@@ -8,7 +8,9 @@ import csv
 import json
 import argparse
 from datetime import datetime
+from itertools import chain
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional
 from database import Database
 from config import EXPORT_DIRECTORY, EXPORT_FIELDS, HUBSPOT_ENABLED
 from utils.logger import get_logger
@@ -27,13 +29,27 @@ except ImportError:
 class LeadExporter:
     """Export leads to various formats"""
     
+    # Column order for CRM-ready exports
+    CRM_FIELDS = [
+        'Company', 'Industry', 'City', 'State', 'Country', 'Phone', 'Email', 'Website',
+        'Lead Score', 'Lead Status', 'Lead Source', 'Notes', 'Created Date'
+    ]
+    
     def __init__(self):
         self.db = Database()
         Path(EXPORT_DIRECTORY).mkdir(exist_ok=True)
     
+    def _peek(self, leads: Iterable) -> Iterable:
+        """Return an equivalent iterable, or None if leads is empty"""
+        leads = iter(leads)
+        first = next(leads, None)
+        if first is None:
+            return None
+        return chain([first], leads)
+    
     def export_to_csv(
         self,
-        leads: list,
+        leads: Iterable[Dict],
         filename: str = None,
         fields: list = None
     ) -> str:
@@ -41,14 +57,15 @@ class LeadExporter:
         Export leads to CSV
         
         Args:
-            leads: List of lead dictionaries
+            leads: Lead dictionaries (any iterable; written as it streams)
             filename: Output filename
             fields: Fields to include (defaults to EXPORT_FIELDS)
         
         Returns:
             Path to created file
         """
-        if not leads:
+        leads = self._peek(leads)
+        if leads is None:
             print("⚠️  No leads to export")
             return None
         
@@ -60,30 +77,34 @@ class LeadExporter:
         
         filepath = Path(EXPORT_DIRECTORY) / filename
         
+        count = 0
         with open(filepath, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
             writer.writeheader()
-            writer.writerows(leads)
+            for lead in leads:
+                writer.writerow(lead)
+                count += 1
         
-        print(f"✅ Exported {len(leads)} leads to: {filepath}")
+        print(f"✅ Exported {count} leads to: {filepath}")
         return str(filepath)
     
     def export_to_json(
         self,
-        leads: list,
+        leads: Iterable[Dict],
         filename: str = None
     ) -> str:
         """
         Export leads to JSON
         
         Args:
-            leads: List of lead dictionaries
+            leads: Lead dictionaries (any iterable; written as it streams)
             filename: Output filename
         
         Returns:
             Path to created file
         """
-        if not leads:
+        leads = self._peek(leads)
+        if leads is None:
             print("⚠️  No leads to export")
             return None
         
@@ -93,16 +114,24 @@ class LeadExporter:
         
         filepath = Path(EXPORT_DIRECTORY) / filename
         
+        # Write the array element by element so nothing is held in memory
+        count = 0
         with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(leads, f, indent=2, default=str)
-        
-        print(f"✅ Exported {len(leads)} leads to: {filepath}")
+            f.write('[')
+            for lead in leads:
+                f.write(',\n  ' if count else '\n  ')
+                f.write(json.dumps(lead, default=str))
+                count += 1
+            f.write('\n]\n')
+        
+        print(f"✅ Exported {count} leads to: {filepath}")
         return str(filepath)
     
     def export_for_email_campaign(
         self,
         status: str = 'qualified',
-        min_score: int = 70
+        min_score: int = 70,
+        email_statuses: Optional[List[str]] = None
     ) -> str:
         """
         Export leads formatted for email campaign
@@ -111,18 +140,20 @@ class LeadExporter:
         Args:
             status: Lead status to export
             min_score: Minimum AI score
+            email_statuses: Only export leads whose email verification status
+                is one of these (e.g. ['deliverable']; 'unverified' matches
+                leads not verified yet). None exports all.
         
         Returns:
             Path to created file
         """
-        leads = self.db.get_leads(
+        leads = self.db.iter_leads(
             status=status,
-            min_score=min_score,
-            limit=10000
+            min_score=min_score
         )
         
         # Filter to only leads with email and outreach message
-        campaign_leads = [
+        campaign_leads = (
             {
                 'name': lead['name'],
                 'email': lead['email'],
@@ -131,13 +162,16 @@ class LeadExporter:
                 'subject': f"{lead['city']} {lead['category']} x Eleven Views?",
                 'message': lead['ai_outreach_message'],
                 'website': lead['website'],
-                'phone': lead['phone']
+                'phone': lead['phone'],
+                'email_status': lead.get('email_status') or 'unverified'
             }
             for lead in leads
             if lead.get('email') and lead.get('ai_outreach_message')
-        ]
+            and (email_statuses is None or (lead.get('email_status') or 'unverified') in email_statuses)
+        )
         
-        if not campaign_leads:
+        campaign_leads = self._peek(campaign_leads)
+        if campaign_leads is None:
             print("⚠️  No leads with email and outreach message found")
             return None
         
@@ -147,7 +181,7 @@ class LeadExporter:
         return self.export_to_csv(
             campaign_leads,
             filename=filename,
-            fields=['name', 'email', 'city', 'score', 'subject', 'message', 'website', 'phone']
+            fields=['name', 'email', 'city', 'score', 'subject', 'message', 'website', 'phone', 'email_status']
         )
     
     def export_for_cold_calling(
@@ -166,14 +200,13 @@ class LeadExporter:
         Returns:
             Path to created file
         """
-        leads = self.db.get_leads(
+        leads = self.db.iter_leads(
             status=status,
-            min_score=min_score,
-            limit=10000
+            min_score=min_score
         )
         
         # Filter to only leads with phone
-        call_leads = [
+        call_leads = (
             {
                 'name': lead['name'],
                 'phone': lead['phone'],
@@ -186,9 +219,10 @@ class LeadExporter:
             }
             for lead in leads
             if lead.get('phone')
-        ]
+        )
         
-        if not call_leads:
+        call_leads = self._peek(call_leads)
+        if call_leads is None:
             print("⚠️  No leads with phone numbers found")
             return None
         
@@ -216,10 +250,10 @@ class LeadExporter:
         Returns:
             Path to created file
         """
-        leads = self.db.get_leads(status=status, limit=10000)
+        leads = self.db.iter_leads(status=status)
         
         # Map to common CRM fields
-        crm_leads = [
+        crm_leads = (
             {
                 'Company': lead['name'],
                 'Industry': lead['category'],
@@ -236,7 +270,7 @@ class LeadExporter:
                 'Created Date': lead['scraped_at']
             }
             for lead in leads
-        ]
+        )
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"crm_import_{status}_{timestamp}.{format}"
@@ -245,7 +279,7 @@ class LeadExporter:
             return self.export_to_csv(
                 crm_leads,
                 filename=filename,
-                fields=list(crm_leads[0].keys()) if crm_leads else []
+                fields=self.CRM_FIELDS
             )
         else:
             return self.export_to_json(crm_leads, filename=filename)
@@ -254,7 +288,8 @@ class LeadExporter:
         self,
         status: str = 'qualified',
         min_score: int = 60,
-        batch_size: int = 100
+        batch_size: int = 100,
+        force: bool = False
     ) -> Dict:
         """
         Sync leads directly to HubSpot CRM
@@ -263,6 +298,7 @@ class LeadExporter:
             status: Lead status to sync
             min_score: Minimum AI score
             batch_size: Number of leads to sync per batch
+            force: Re-send leads even if unchanged since their last sync
         
         Returns:
             Sync statistics
@@ -282,42 +318,42 @@ class LeadExporter:
             print("   Get your key at: https://app.hubspot.com/private-apps")
             return {'success': False, 'reason': 'not_enabled'}
         
-        # Get leads to sync
-        leads = self.db.get_leads(
-            status=status,
-            min_score=min_score,
-            limit=10000
-        )
+        # Count leads to sync (the leads themselves are streamed)
+        total = self.db.count_leads(status=status, min_score=min_score)
         
-        if not leads:
+        if not total:
             logger.warning("No leads found to sync")
             print("⚠️  No leads found matching criteria")
             return {'success': False, 'reason': 'no_leads'}
         
-        logger.info(f"Syncing {len(leads)} leads to HubSpot...")
-        print(f"\n📤 Syncing {len(leads)} leads to HubSpot...")
+        logger.info(f"Syncing {total} leads to HubSpot...")
+        print(f"\n📤 Syncing {total} leads to HubSpot...")
         
         # Sync in batches
         stats = {
-            'total': len(leads),
+            'total': total,
             'created': 0,
             'updated': 0,
+            'unchanged': 0,
+            'skipped': 0,
             'failed': 0
         }
         
-        for i in range(0, len(leads), batch_size):
-            batch = leads[i:i + batch_size]
-            batch_stats = hubspot.sync_leads_batch(batch)
+        processed = 0
+        for batch in self.db.iter_lead_batches(status=status, min_score=min_score, batch_size=batch_size):
+            batch_stats = hubspot.sync_leads_batch(batch, force=force)
             
-            stats['created'] += batch_stats.get('created', 0)
-            stats['updated'] += batch_stats.get('updated', 0)
-            stats['failed'] += batch_stats.get('failed', 0)
+            for key in ('created', 'updated', 'unchanged', 'skipped', 'failed'):
+                stats[key] += batch_stats.get(key, 0)
             
-            print(f"   Processed {min(i + batch_size, len(leads))}/{len(leads)} leads...")
+            processed += len(batch)
+            print(f"   Processed {processed}/{total} leads...")
         
         print(f"\n✅ HubSpot sync complete!")
         print(f"   Created: {stats['created']}")
         print(f"   Updated: {stats['updated']}")
+        print(f"   Unchanged: {stats['unchanged']} (use --force to re-send)")
+        print(f"   Skipped: {stats['skipped'] - stats['unchanged']} (duplicate email)")
         print(f"   Failed: {stats['failed']}")
         
         return stats
@@ -356,6 +392,20 @@ def main():
         help='Output filename'
     )
     
+    parser.add_argument(
+        '--email-status',
+        type=str,
+        nargs='+',
+        choices=['deliverable', 'risky', 'undeliverable', 'unknown', 'invalid', 'unverified'],
+        help='Email format only: keep leads with these verification results (run verify_emails.py first)'
+    )
+    
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='HubSpot format only: re-send leads unchanged since their last sync'
+    )
+    
     args = parser.parse_args()
     
     exporter = LeadExporter()
@@ -368,21 +418,26 @@ def main():
     
     # Route to appropriate export method
     if args.format == 'hubspot':
-        stats = exporter.sync_to_hubspot(status=status, min_score=args.min_score)
+        stats = exporter.sync_to_hubspot(status=status, min_score=args.min_score, force=args.force)
         if stats.get('success') is not False:
-            print(f"\n🎉 Successfully synced {stats.get('created', 0) + stats.get('updated', 0)} leads to HubSpot!")
+            synced = stats.get('created', 0) + stats.get('updated', 0) + stats.get('unchanged', 0)
+            print(f"\n🎉 Successfully synced {synced} leads to HubSpot!")
         filepath = None
     elif args.format == 'email':
-        filepath = exporter.export_for_email_campaign(status=status, min_score=args.min_score)
+        filepath = exporter.export_for_email_campaign(
+            status=status,
+            min_score=args.min_score,
+            email_statuses=args.email_status
+        )
     elif args.format == 'call':
         filepath = exporter.export_for_cold_calling(status=status, min_score=args.min_score)
     elif args.format == 'crm':
         filepath = exporter.export_crm_import(status=status, format='csv')
     elif args.format == 'json':
-        leads = exporter.db.get_leads(status=status, min_score=args.min_score, limit=10000)
+        leads = exporter.db.iter_leads(status=status, min_score=args.min_score)
         filepath = exporter.export_to_json(leads, filename=args.output)
     else:  # csv
-        leads = exporter.db.get_leads(status=status, min_score=args.min_score, limit=10000)
+        leads = exporter.db.iter_leads(status=status, min_score=args.min_score)
         filepath = exporter.export_to_csv(leads, filename=args.output)
     
     if filepath:
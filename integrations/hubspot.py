@@ -6,10 +6,12 @@ Syncs luxury sports opportunities directly to HubSpot contacts and companies
 
 import os
 import json
+import hashlib
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 from utils.logger import get_logger
-from utils.rate_limiter import get_rate_limiter
+from utils.rate_limiter import get_rate_limiter, parse_retry_after
+from database import Database
 from config import HUBSPOT_API_KEY, HUBSPOT_ENABLED
 
 logger = get_logger('hubspot')
@@ -48,11 +50,34 @@ class HubSpotIntegration:
         
         # Rate limiter (HubSpot allows 100 requests per 10 seconds)
         self.rate_limiter = get_rate_limiter('hubspot', max_calls=90, period=10.0)
+        
+        # Lead -> contact links (crm_links), so syncs skip searches and
+        # unchanged leads
+        self.db = Database()
     
     def is_enabled(self) -> bool:
         """Check if HubSpot integration is enabled"""
         return self.enabled and self.client is not None
     
+    def _record_success(self):
+        """Let the adaptive limiter ramp back up after a clean call"""
+        self.rate_limiter.record_success('hubspot')
+    
+    def _record_error(self, error: Exception):
+        """
+        Feed an API error's status and rate-limit headers to the limiter
+        
+        The SDK only exposes response headers on errors (ApiException), so
+        this is where X-HubSpot-RateLimit-* and Retry-After are read.
+        
+        Args:
+            error: Exception raised by the HubSpot client
+        """
+        headers = getattr(error, 'headers', None)
+        self.rate_limiter.observe_headers(headers, 'hubspot')
+        if getattr(error, 'status', None) == 429:
+            self.rate_limiter.record_throttle('hubspot', retry_after=parse_retry_after(headers))
+    
     def _map_lead_to_hubspot_contact(self, lead: Dict) -> Dict:
         """
         Map Eleven Views opportunity to HubSpot contact properties
@@ -151,12 +176,15 @@ class HubSpotIntegration:
                 simple_public_object_input_for_create=SimplePublicObjectInputForCreate(properties=properties)
             )
             
+            self._record_success()
+            
             contact_id = response.id
             logger.info(f"Created HubSpot contact: {contact_id} for {lead.get('name')}")
             
             return contact_id
             
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Error creating HubSpot contact for {lead.get('name')}: {e}", exc_info=True)
             return None
     
@@ -185,11 +213,13 @@ class HubSpotIntegration:
                 contact_id=contact_id,
                 simple_public_object_input=SimplePublicObjectInput(properties=properties)
             )
+            self._record_success()
             
             logger.info(f"Updated HubSpot contact: {contact_id}")
             return True
             
         except Exception as e:
+            self._record_error(e)
             logger.error(f"Error updating HubSpot contact {contact_id}: {e}", exc_info=True)
             return False
     
@@ -226,6 +256,7 @@ class HubSpotIntegration:
                 filter_groups=[filter_group],
                 limit=1
             )
+            self._record_success()
             
             if response.results and len(response.results) > 0:
                 return response.results[0].id
@@ -233,16 +264,18 @@ class HubSpotIntegration:
             return None
             
         except Exception as e:
+            self._record_error(e)
             # Contact not found is expected
             logger.debug(f"Contact not found by email {email}: {e}")
             return None
     
-    def sync_lead(self, lead: Dict) -> Dict:
+    def sync_lead(self, lead: Dict, force: bool = False) -> Dict:
         """
         Sync a lead to HubSpot (create or update)
         
         Args:
             lead: Lead dictionary
+            force: Re-send the lead even if unchanged since its last sync
         
         Returns:
             Dict with sync results
@@ -256,11 +289,21 @@ class HubSpotIntegration:
             'action': None
         }
         
-        # Try to find existing contact by email
-        email = lead.get('email')
-        existing_id = None
-        
-        if email:
+        # Use the stored link if this lead was synced before
+        email = (lead.get('email') or '').strip().lower()
+        sync_hash = self._sync_hash(lead)
+        link = self.db.get_crm_links([lead['id']]).get(lead['id']) if lead.get('id') else None
+        
+        if link and link['sync_hash'] == sync_hash and not force:
+            result.update(success=True, contact_id=link['contact_id'], action='unchanged')
+            return result
+        
+        existing_id = link['contact_id'] if link else None
+        if not existing_id and email:
+            # Never overwrite the contact another lead with this email owns
+            if email in self.db.get_crm_links_by_email([email]):
+                result.update(action='skipped', reason='Email already synced for another lead')
+                return result
             existing_id = self.find_contact_by_email(email)
         
         if existing_id:
@@ -269,6 +312,9 @@ class HubSpotIntegration:
                 result['success'] = True
                 result['contact_id'] = existing_id
                 result['action'] = 'updated'
+            elif link:
+                # The linked contact may be gone; look it up again next time
+                self.db.delete_crm_links([lead['id']])
         else:
             # Create new contact
             contact_id = self.create_contact(lead)
@@ -277,50 +323,288 @@ class HubSpotIntegration:
                 result['contact_id'] = contact_id
                 result['action'] = 'created'
         
+        if result['success'] and lead.get('id'):
+            self.db.save_crm_links([{
+                'lead_id': lead['id'],
+                'contact_id': result['contact_id'],
+                'email': email or None,
+                'sync_hash': sync_hash
+            }])
+        
         return result
     
-    def sync_leads_batch(self, leads: List[Dict]) -> Dict:
+    def _sync_hash(self, lead: Dict) -> str:
+        """Hash of the contact properties a lead syncs (changes trigger an update)"""
+        properties = self._map_lead_to_hubspot_contact(lead)
+        return hashlib.sha256(json.dumps(properties, sort_keys=True, default=str).encode()).hexdigest()
+    
+    # HubSpot batch endpoints accept up to 100 inputs per call
+    BATCH_SIZE = 100
+    
+    def sync_leads_batch(self, leads: List[Dict], force: bool = False) -> Dict:
         """
-        Sync multiple leads to HubSpot
+        Sync multiple leads to HubSpot using the batch endpoints
+        
+        Per chunk of BATCH_SIZE leads: leads synced before are matched to
+        their contact through crm_links (no search) and skipped if their
+        properties are unchanged; leads sharing an email with a lead synced
+        earlier (in this chunk or a previous run) are skipped, so one lead's
+        contact is never overwritten by another; one batch read (by email) finds the rest,
+        then one batch create and one batch update write them. A rejected
+        batch call falls back to per-lead calls so every lead still gets its
+        own outcome.
         
         Args:
             leads: List of lead dictionaries
+            force: Re-send leads even if unchanged since their last sync
         
         Returns:
-            Summary statistics
+            Summary statistics, plus 'results': one
+            {'contact_id', 'action', 'error'} per lead in input order
+            (action is 'created', 'updated', 'unchanged', 'skipped' or None
+            on failure). 'skipped' counts unchanged leads too.
         """
         if not self.is_enabled():
             return {'success': False, 'reason': 'HubSpot not enabled'}
         
+        logger.info(f"Syncing {len(leads)} leads to HubSpot...")
+        
+        results = []
+        for start in range(0, len(leads), self.BATCH_SIZE):
+            chunk = leads[start:start + self.BATCH_SIZE]
+            try:
+                results.extend(self._sync_chunk(chunk, force))
+            except Exception as e:
+                logger.error(f"Error syncing HubSpot batch of {len(chunk)} leads: {e}", exc_info=True)
+                results.extend({'contact_id': None, 'action': None, 'error': str(e)} for _ in chunk)
+        
         stats = {
             'total': len(leads),
-            'created': 0,
-            'updated': 0,
-            'failed': 0,
-            'skipped': 0
+            'created': sum(1 for r in results if r['action'] == 'created'),
+            'updated': sum(1 for r in results if r['action'] == 'updated'),
+            'failed': sum(1 for r in results if r['action'] is None),
+            'skipped': sum(1 for r in results if r['action'] in ('skipped', 'unchanged')),
+            'unchanged': sum(1 for r in results if r['action'] == 'unchanged'),
+            'results': results
         }
         
-        logger.info(f"Syncing {len(leads)} leads to HubSpot...")
+        logger.info(
+            f"HubSpot sync complete: {stats['created']} created, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['failed']} failed"
+        )
         
-        for lead in leads:
-            try:
-                result = self.sync_lead(lead)
-                
-                if result['success']:
-                    if result['action'] == 'created':
-                        stats['created'] += 1
-                    elif result['action'] == 'updated':
-                        stats['updated'] += 1
+        return stats
+    
+    def _sync_chunk(self, leads: List[Dict], force: bool = False) -> List[Dict]:
+        """Sync up to BATCH_SIZE leads; returns per-lead results in order"""
+        results = [{'contact_id': None, 'action': None, 'error': None} for _ in leads]
+        emails = [(lead.get('email') or '').strip().lower() for lead in leads]
+        hashes = [self._sync_hash(lead) for lead in leads]
+        links = self.db.get_crm_links([lead['id'] for lead in leads if lead.get('id')])
+        
+        creates = []
+        updates = []
+        linked_updates = set()
+        unresolved = []
+        first_by_email = {}
+        for i, lead in enumerate(leads):
+            link = links.get(lead.get('id'))
+            if link:
+                if not force and link['sync_hash'] == hashes[i]:
+                    results[i].update(contact_id=link['contact_id'], action='unchanged')
                 else:
-                    stats['failed'] += 1
-                    
-            except Exception as e:
-                logger.error(f"Error syncing lead {lead.get('name')}: {e}")
-                stats['failed'] += 1
+                    updates.append((i, link['contact_id']))
+                    linked_updates.add(i)
+                continue
+            
+            # One lead per email: HubSpot dedupes contacts on email
+            email = emails[i]
+            if email in first_by_email:
+                results[i].update(action='skipped', error='Duplicate email in batch')
+                continue
+            if email:
+                first_by_email[email] = i
+            unresolved.append(i)
+        
+        # Emails another lead was already synced with stay that lead's
+        # contact (same rule as duplicates within the chunk); HubSpot is
+        # searched for the rest
+        owned = self.db.get_crm_links_by_email(list(first_by_email))
+        existing = self._batch_read_by_email([e for e in first_by_email if e not in owned])
+        
+        for i in unresolved:
+            email = emails[i]
+            if email in owned:
+                results[i].update(action='skipped', error='Email already synced for another lead')
+            elif email in existing:
+                updates.append((i, existing[email]))
+            elif email:
+                creates.append(i)
+            else:
+                # Batch create results can only be matched back by email
+                contact_id = self.create_contact(leads[i])
+                results[i].update(
+                    contact_id=contact_id,
+                    action='created' if contact_id else None,
+                    error=None if contact_id else 'Create failed'
+                )
+        
+        if creates:
+            self._batch_create(leads, creates, results)
+        if updates:
+            self._batch_update(leads, updates, results)
+        
+        # Remember where each lead went; forget links whose contact update
+        # failed (it may have been deleted) so the next sync looks it up
+        self.db.save_crm_links([
+            {
+                'lead_id': lead['id'],
+                'contact_id': result['contact_id'],
+                'email': emails[i] or None,
+                'sync_hash': hashes[i]
+            }
+            for i, (lead, result) in enumerate(zip(leads, results))
+            if lead.get('id') and result['action'] in ('created', 'updated')
+        ])
+        self.db.delete_crm_links([
+            leads[i]['id'] for i in linked_updates if results[i]['action'] is None
+        ])
+        
+        return results
+    
+    def _batch_read_by_email(self, emails: List[str]) -> Dict[str, str]:
+        """
+        Look up existing contacts by email in one call
         
-        logger.info(f"HubSpot sync complete: {stats['created']} created, {stats['updated']} updated, {stats['failed']} failed")
+        Returns:
+            Lowercased email -> contact ID for the emails that exist
+        """
+        if not emails:
+            return {}
         
-        return stats
+        try:
+            self.rate_limiter.wait_if_needed('hubspot')
+            
+            from hubspot.crm.contacts import BatchReadInputSimplePublicObjectId, SimplePublicObjectId
+            
+            response = self.client.crm.contacts.batch_api.read(
+                batch_read_input_simple_public_object_id=BatchReadInputSimplePublicObjectId(
+                    id_property='email',
+                    properties=['email'],
+                    inputs=[SimplePublicObjectId(id=email) for email in emails]
+                )
+            )
+            self._record_success()
+            
+            # Missing emails come back as per-item errors, not results
+            return {
+                (contact.properties.get('email') or '').lower(): contact.id
+                for contact in response.results
+                if contact.properties.get('email')
+            }
+            
+        except Exception as e:
+            self._record_error(e)
+            logger.warning(f"HubSpot batch read failed, looking up {len(emails)} contacts one by one: {e}")
+            found = {}
+            for email in emails:
+                contact_id = self.find_contact_by_email(email)
+                if contact_id:
+                    found[email] = contact_id
+            return found
+    
+    def _batch_create(self, leads: List[Dict], indices: List[int], results: List[Dict]):
+        """Create contacts for leads[indices] in one call, filling results"""
+        try:
+            self.rate_limiter.wait_if_needed('hubspot')
+            
+            from hubspot.crm.contacts import (
+                BatchInputSimplePublicObjectInputForCreate, SimplePublicObjectInputForCreate
+            )
+            
+            response = self.client.crm.contacts.batch_api.create(
+                batch_input_simple_public_object_input_for_create=BatchInputSimplePublicObjectInputForCreate(
+                    inputs=[
+                        SimplePublicObjectInputForCreate(properties=self._map_lead_to_hubspot_contact(leads[i]))
+                        for i in indices
+                    ]
+                )
+            )
+            self._record_success()
+            
+        except Exception as e:
+            # The whole batch is rejected if any input is invalid or already
+            # exists; retry one by one so only the bad leads fail
+            self._record_error(e)
+            logger.warning(f"HubSpot batch create failed, creating {len(indices)} contacts one by one: {e}")
+            for i in indices:
+                contact_id = self.create_contact(leads[i])
+                results[i].update(
+                    contact_id=contact_id,
+                    action='created' if contact_id else None,
+                    error=None if contact_id else 'Create failed'
+                )
+            return
+        
+        # Results are not guaranteed to be in input order: match on email
+        created = {
+            (contact.properties.get('email') or '').lower(): contact.id
+            for contact in response.results
+        }
+        error = self._batch_error_message(response)
+        for i in indices:
+            contact_id = created.get((leads[i].get('email') or '').strip().lower())
+            if contact_id:
+                results[i].update(contact_id=contact_id, action='created', error=None)
+            else:
+                results[i].update(error=error or 'Not created')
+        
+        logger.info(f"Created {len(created)} HubSpot contacts in one batch")
+    
+    def _batch_update(self, leads: List[Dict], updates: List[tuple], results: List[Dict]):
+        """Update (lead index, contact ID) pairs in one call, filling results"""
+        try:
+            self.rate_limiter.wait_if_needed('hubspot')
+            
+            from hubspot.crm.contacts import BatchInputSimplePublicObjectBatchInput, SimplePublicObjectBatchInput
+            
+            response = self.client.crm.contacts.batch_api.update(
+                batch_input_simple_public_object_batch_input=BatchInputSimplePublicObjectBatchInput(
+                    inputs=[
+                        SimplePublicObjectBatchInput(id=contact_id, properties=self._map_lead_to_hubspot_contact(leads[i]))
+                        for i, contact_id in updates
+                    ]
+                )
+            )
+            self._record_success()
+            
+        except Exception as e:
+            self._record_error(e)
+            logger.warning(f"HubSpot batch update failed, updating {len(updates)} contacts one by one: {e}")
+            for i, contact_id in updates:
+                updated = self.update_contact(contact_id, leads[i])
+                results[i].update(
+                    contact_id=contact_id,
+                    action='updated' if updated else None,
+                    error=None if updated else 'Update failed'
+                )
+            return
+        
+        updated = {contact.id for contact in response.results}
+        error = self._batch_error_message(response)
+        for i, contact_id in updates:
+            if contact_id in updated:
+                results[i].update(contact_id=contact_id, action='updated', error=None)
+            else:
+                results[i].update(contact_id=contact_id, error=error or 'Not updated')
+        
+        logger.info(f"Updated {len(updated)} HubSpot contacts in one batch")
+    
+    def _batch_error_message(self, response) -> Optional[str]:
+        """Join the per-item error messages of a partial (207) batch response"""
+        errors = getattr(response, 'errors', None) or []
+        messages = [getattr(error, 'message', None) or str(error) for error in errors]
+        return '; '.join(messages) or None
     
     def test_connection(self) -> Dict:
         """
@@ -340,6 +624,7 @@ class HubSpotIntegration:
             
             # Try to get contacts page (simple connection test)
             response = self.client.crm.contacts.basic_api.get_page(limit=1)
+            self._record_success()
             
             return {
                 'success': True,
@@ -348,6 +633,7 @@ class HubSpotIntegration:
             }
             
         except Exception as e:
+            self._record_error(e)
             logger.error(f"HubSpot connection test failed: {e}")
             return {
                 'success': False,
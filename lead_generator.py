@@ -7,20 +7,23 @@ Powered by Apify + Google Gemini with enterprise-grade logging, caching, and enr
 
 import os
 import json
+import hashlib
 import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from apify_client import ApifyClient
-import google.generativeai as genai
 from dotenv import load_dotenv
 from database import Database
 from ai_personalizer import AIPersonalizer
-from utils.logger import get_logger, log_lead_generation, log_api_call, log_ai_request
+from utils.logger import get_logger, log_lead_generation, log_api_call
 from utils.cache import get_cache, cached
 from utils.rate_limiter import get_rate_limiter
 from utils.email_finder import get_email_finder
+from utils.ai_client import get_ai_client
 from utils.security import SecurityValidator
+from config import ENRICHMENT_CONCURRENCY, AI_SCORING_BATCH_SIZE, AI_PROMPT_VERSION, AI_ANALYSIS_CACHE_TTL, SCRAPE_STALE_TTL
 
 # Load environment variables
 load_dotenv()
@@ -34,6 +37,12 @@ class LeadGenerator:
     # Apify Actor ID for Google Maps Scraper
     GOOGLE_MAPS_ACTOR = "nwua9Gu5YrADL7ZDj"
     
+    # Enriched leads buffered by the writer before each save_leads transaction
+    SAVE_BATCH_SIZE = 50
+    
+    # Seconds to wait before retrying a failed batched scoring request
+    BATCH_RETRY_DELAY = 2.0
+    
     def __init__(self):
         """Initialize the lead generator"""
         apify_token = os.getenv('APIFY_API_TOKEN')
@@ -45,7 +54,7 @@ class LeadGenerator:
             raise ValueError("GOOGLE_API_KEY not found in environment")
         
         self.apify = ApifyClient(apify_token)
-        genai.configure(api_key=google_key)
+        self.ai = get_ai_client()
         self.db = Database()
         self.personalizer = AIPersonalizer()
         self.cache = get_cache()
@@ -53,7 +62,8 @@ class LeadGenerator:
         
         # Rate limiters
         self.apify_limiter = get_rate_limiter('apify', max_calls=30, period=60.0)
-        self.ai_limiter = get_rate_limiter('google_ai', max_calls=60, period=60.0)
+        self.ai_limiter = self.ai.limiter
+        self._scoring_fingerprint = None
         
         logger.info("LeadGenerator initialized")
     
@@ -62,7 +72,8 @@ class LeadGenerator:
         search_query: str,
         max_results: int = 100,
         location: Optional[str] = None,
-        min_rating: float = 3.5
+        min_rating: float = 3.5,
+        serve_stale: bool = False
     ) -> List[Dict]:
         """
         Scrape businesses from Google Maps using Apify
@@ -72,26 +83,79 @@ class LeadGenerator:
             max_results: Maximum number of results to return
             location: Optional location override
             min_rating: Minimum rating filter (1.0-5.0)
+            serve_stale: Return results up to SCRAPE_STALE_TTL old immediately
+                and refresh them in the background
         
         Returns:
             List of business dictionaries with enriched data
         """
-        start_time = time.time()
+        return self._scrape_google_maps(search_query, max_results, location, min_rating, serve_stale)[0]
+    
+    def _scrape_google_maps(
+        self,
+        search_query: str,
+        max_results: int = 100,
+        location: Optional[str] = None,
+        min_rating: float = 3.5,
+        serve_stale: bool = False
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Scrape businesses from Google Maps, reporting whether results were stale
         
+        Returns:
+            (businesses, served_stale)
+        """
         # Validate input
         is_valid, error_msg = validator.validate_search_query(search_query)
         if not is_valid:
             logger.error(f"Invalid search query: {error_msg}")
-            return []
+            return [], False
         
         logger.info(f"Searching Google Maps: '{search_query}' (target: {max_results}, min_rating: {min_rating})")
         
-        # Check cache first
         cache_key = f"apify_search:{search_query}:{max_results}:{min_rating}"
+        
+        def run_search():
+            return self._run_apify_search(search_query, max_results, location, min_rating)
+        
+        if serve_stale:
+            # Serve stale results at once; a background run refreshes them
+            results, served_stale = self.cache.get_or_revalidate(
+                cache_key, run_search, ttl=3600, stale_ttl=SCRAPE_STALE_TTL
+            )
+            if served_stale:
+                logger.info(f"Serving stale results for search query: {search_query} (refreshing in background)")
+            return (results if results is not None else []), served_stale
+        
+        # Check cache first
         cached_results = self.cache.get(cache_key, ttl=3600)  # 1 hour cache
-        if cached_results:
+        if cached_results is not None:
             logger.info(f"Cache hit for search query: {search_query}")
-            return cached_results
+            return cached_results, False
+        
+        # Concurrent identical searches (other threads or workers) wait for
+        # a single Apify run instead of each starting a paid one. Results are
+        # kept for SCRAPE_STALE_TTL so a later serve_stale call can use them
+        results = self.cache.get_or_compute(
+            cache_key, run_search, ttl=3600, store_ttl=SCRAPE_STALE_TTL
+        )
+        return (results if results is not None else []), False
+    
+    def _run_apify_search(
+        self,
+        search_query: str,
+        max_results: int,
+        location: Optional[str],
+        min_rating: float
+    ) -> Optional[List[Dict]]:
+        """
+        Run the Google Maps actor and filter its results
+        
+        Returns:
+            Businesses matching min_rating, or None if the run failed or
+            found none (so an empty run is not cached)
+        """
+        start_time = time.time()
         
         # Rate limiting
         self.apify_limiter.wait_if_needed('apify')
@@ -118,6 +182,7 @@ class LeadGenerator:
             api_start = time.time()
             run = self.apify.actor(self.GOOGLE_MAPS_ACTOR).call(run_input=run_input)
             api_duration = (time.time() - api_start) * 1000
+            self.apify_limiter.record_success('apify')
             
             log_api_call(
                 service='apify',
@@ -141,25 +206,26 @@ class LeadGenerator:
             
             logger.info(f"{len(filtered_items)} businesses match rating criteria (min: {min_rating})")
             
-            # Cache results
-            self.cache.set(cache_key, filtered_items, ttl=3600)
-            
             duration = time.time() - start_time
             logger.info(f"Scraping completed in {duration:.2f}s")
             
-            return filtered_items
+            # A zero-result run may be transient; don't cache it for a day
+            return filtered_items or None
             
         except Exception as e:
             duration = (time.time() - start_time) * 1000
             logger.error(f"Error scraping Google Maps: {e}", exc_info=True)
+            status_code = getattr(e, 'status_code', None) or 500
+            if status_code == 429:
+                self.apify_limiter.record_throttle('apify')
             log_api_call(
                 service='apify',
                 endpoint='google-maps-scraper',
-                status_code=500,
+                status_code=status_code,
                 duration_ms=duration,
                 error=str(e)
             )
-            return []
+            return None
     
     def enrich_lead(self, raw_lead: Dict) -> Dict:
         """
@@ -171,53 +237,79 @@ class LeadGenerator:
         Returns:
             Enriched lead dictionary
         """
-        try:
-            # Standardize lead data
-            enriched = {
-                # Basic info
-                'name': raw_lead.get('title', ''),
-                'category': raw_lead.get('categoryName', ''),
-                'address': raw_lead.get('address', ''),
-                'city': raw_lead.get('city', ''),
-                'state': raw_lead.get('state', ''),
-                'postal_code': raw_lead.get('postalCode', ''),
-                'country': raw_lead.get('countryCode', 'US'),
-                
-                # Contact info
-                'phone': raw_lead.get('phone', ''),
-                'website': raw_lead.get('website', ''),
-                'email': self._extract_email(raw_lead),
-                
-                # Social & reputation
-                'rating': raw_lead.get('totalScore', 0),
-                'review_count': raw_lead.get('reviewsCount', 0),
-                'google_maps_url': raw_lead.get('url', ''),
-                'place_id': raw_lead.get('placeId', ''),
-                
-                # Business intelligence
-                'is_claimed': raw_lead.get('claimThisBusiness', False),
-                'is_open': raw_lead.get('temporarilyClosed', False) == False,
-                'price_level': raw_lead.get('priceLevel', ''),
-                
-                # Metadata
-                'scraped_at': datetime.now().isoformat(),
-                'source': 'google_maps',
-                'status': 'new',
-                
-                # AI-generated fields (to be filled)
-                'ai_lead_score': None,
-                'ai_insights': None,
-                'ai_outreach_message': None,
-            }
+        return self.enrich_leads([raw_lead])[0]
+    
+    def enrich_leads(self, raw_leads: List[Dict], refresh_ai: bool = False) -> List[Dict]:
+        """
+        Enrich a group of raw leads, scoring them with one batched AI request
+        
+        Args:
+            raw_leads: Raw data from Google Maps
+            refresh_ai: Ignore cached AI analyses and re-score every lead
+        
+        Returns:
+            Enriched lead dictionaries, in input order
+        """
+        standardized = []
+        for raw_lead in raw_leads:
+            try:
+                standardized.append(self._standardize_lead(raw_lead))
+            except Exception as e:
+                logger.error(f"Error enriching lead {raw_lead.get('title', 'Unknown')}: {e}", exc_info=True)
+                standardized.append(None)
+        
+        # AI-powered lead scoring and insights
+        leads = [lead for lead in standardized if lead is not None]
+        self._add_ai_intelligence_batch(leads, refresh=refresh_ai)
+        
+        return [lead if lead is not None else raw_lead for lead, raw_lead in zip(standardized, raw_leads)]
+    
+    def _standardize_lead(self, raw_lead: Dict) -> Dict:
+        """
+        Map raw Google Maps data onto the lead schema
+        
+        Args:
+            raw_lead: Raw data from Google Maps
+        
+        Returns:
+            Standardized lead dictionary (AI fields unset)
+        """
+        return {
+            # Basic info
+            'name': raw_lead.get('title', ''),
+            'category': raw_lead.get('categoryName', ''),
+            'address': raw_lead.get('address', ''),
+            'city': raw_lead.get('city', ''),
+            'state': raw_lead.get('state', ''),
+            'postal_code': raw_lead.get('postalCode', ''),
+            'country': raw_lead.get('countryCode', 'US'),
             
-            # AI-powered lead scoring and insights
-            enriched = self._add_ai_intelligence(enriched)
+            # Contact info
+            'phone': raw_lead.get('phone', ''),
+            'website': raw_lead.get('website', ''),
+            'email': self._extract_email(raw_lead),
             
-            return enriched
+            # Social & reputation
+            'rating': raw_lead.get('totalScore', 0),
+            'review_count': raw_lead.get('reviewsCount', 0),
+            'google_maps_url': raw_lead.get('url', ''),
+            'place_id': raw_lead.get('placeId', ''),
             
-        except Exception as e:
-            logger.error(f"Error enriching lead {raw_lead.get('title', 'Unknown')}: {e}", exc_info=True)
-            return raw_lead
+            # Business intelligence
+            'is_claimed': raw_lead.get('claimThisBusiness', False),
+            'is_open': raw_lead.get('temporarilyClosed', False) == False,
+            'price_level': raw_lead.get('priceLevel', ''),
+            
+            # Metadata
+            'scraped_at': datetime.now().isoformat(),
+            'source': 'google_maps',
+            'status': 'new',
+            
+            # AI-generated fields (to be filled)
+            'ai_lead_score': None,
+            'ai_insights': None,
+            'ai_outreach_message': None,
+        }
     
     def _extract_email(self, lead: Dict) -> Optional[str]:
         """
@@ -258,16 +350,252 @@ class LeadGenerator:
                     first_name = name_parts[0]
                     last_name = name_parts[-1]
             
-            email = self.email_finder.find_email(domain, first_name, last_name)
-            if email and validator.validate_email(email):
-                logger.debug(f"Found email for {lead.get('name')}: {email}")
-                return email
+            # Stored per domain, so leads sharing a domain (and reruns) skip
+            # the provider calls; misses are remembered too
+            result = self.email_finder.lookup_email(domain, first_name, last_name)
+            if result and validator.validate_email(result['email']):
+                logger.debug(f"Found email for {lead.get('name')} via {result['provider']}: {result['email']}")
+                return result['email']
         except Exception as e:
             logger.warning(f"Email finder error for {lead.get('name')}: {e}")
         
         # Fallback: Generate common pattern
         return f"info@{domain}"
     
+    # Static scoring instructions, set once as the model's system instruction
+    SCORING_SYSTEM_INSTRUCTION = """You are the strategic intelligence analyst for Eleven Views, a boutique production house expanding into elite sports management.
+
+Your assessment must help Eleven Views prioritize deals that need:
+- Luxury content production and storytelling
+- Athlete representation and NIL strategy
+- Sponsorship packaging or hospitality experiences
+- Media operations, live capture, or event coverage
+
+Tasks for each organization:
+1. Score their partnership potential from 0-100 (focus on appetite for premium production + sports management support).
+2. Share 2-3 insight bullets highlighting high-leverage ways Eleven Views could create value.
+3. Flag any risks, readiness issues, or credibility concerns.
+4. Suggest 2-3 Eleven Views service lanes that best match their needs (e.g., "Signature docuseries", "Athlete brand suite", "Game-day hybrid production").
+
+Respond with JSON only."""
+    
+    # Lead fields that feed the scoring prompt (and so the AI cache key)
+    SCORING_FIELDS = (
+        'place_id', 'name', 'category', 'city', 'state',
+        'website', 'rating', 'review_count', 'phone'
+    )
+    
+    # Per-lead portion of a single scoring request
+    SCORING_PROMPT = """Evaluate the following organization as a potential Eleven Views partner or client:
+
+Organization: {name}
+Segment: {category}
+Location: {city}, {state}
+Website: {website}
+Public Reputation: {rating}/5 ({review_count} reviews)
+Primary Contact: {phone}
+
+Respond in JSON format:
+{{
+    "score": <0-100>,
+    "insights": ["insight 1", "insight 2", "insight 3"],
+    "concerns": ["concern 1"],
+    "recommended_services": ["service 1", "service 2"]
+}}"""
+    
+    # Per-batch portion of a multi-lead scoring request
+    BATCH_SCORING_PROMPT = """Evaluate each of the following {count} organizations as a potential Eleven Views partner or client:
+
+{organizations}
+
+Respond with a JSON array containing exactly one object per organization, using its "id":
+[
+    {{
+        "id": "<id from input>",
+        "score": <0-100>,
+        "insights": ["insight 1", "insight 2", "insight 3"],
+        "concerns": ["concern 1"],
+        "recommended_services": ["service 1", "service 2"]
+    }}
+]"""
+    
+    def _call_ai(self, prompt: str) -> str:
+        """
+        Send one scoring prompt through the shared AI client
+        
+        Returns:
+            Response text with any JSON code fences removed
+        """
+        response_text = self.ai.generate(prompt, system_instruction=self.SCORING_SYSTEM_INSTRUCTION)
+        
+        # Clean JSON response
+        return response_text.replace('```json', '').replace('```', '').strip()
+    
+    def _parse_ai_analysis(self, data) -> Optional[Dict]:
+        """Validate one scoring result, returning None if it is unusable"""
+        if not isinstance(data, dict):
+            return None
+        try:
+            score = int(round(float(data.get('score'))))
+        except (TypeError, ValueError):
+            return None
+        
+        return {
+            'score': max(0, min(score, 100)),
+            'insights': data.get('insights') or [],
+            'concerns': data.get('concerns') or [],
+            'recommended_services': data.get('recommended_services') or []
+        }
+    
+    def _apply_ai_analysis(self, lead: Dict, analysis: Dict):
+        """Copy a scoring result onto the lead"""
+        lead['ai_lead_score'] = analysis.get('score', 50)
+        lead['ai_insights'] = json.dumps(analysis.get('insights', []))
+        lead['ai_concerns'] = json.dumps(analysis.get('concerns', []))
+        lead['recommended_services'] = json.dumps(analysis.get('recommended_services', []))
+    
+    def _apply_heuristic_score(self, lead: Dict):
+        """Fallback scoring based on simple heuristics when AI output is unusable"""
+        score = 55  # Elevated base score to reflect boutique targeting
+        score += min(lead['rating'] * 8, 32)  # Reputation boost
+        score += min(lead['review_count'] / 15, 18)  # Public proof boost
+        if lead['website']: score += 8  # Digital presence
+        if not lead.get('is_claimed', True): score += 7  # Operational gap Eleven Views can solve
+        
+        lead['ai_lead_score'] = min(score, 100)
+        lead['ai_insights'] = json.dumps([
+            f"Reputation: {lead['rating']}/5 with {lead['review_count']} social proofs",
+            "Active digital presence" if lead['website'] else "Opportunity: elevate digital storytelling",
+            "Ownership signals room for managed experience" if not lead.get('is_claimed', True) else "Claimed listing shows structured operations"
+        ])
+    
+    def _apply_basic_score(self, lead: Dict):
+        """Neutral score for leads the AI could not be reached for, left for manual review"""
+        lead['ai_lead_score'] = 50
+        lead['ai_insights'] = json.dumps(["Basic lead - manual review needed"])
+    
+    def _prompt_fingerprint(self) -> str:
+        """Hash of the scoring templates, prompt version and model"""
+        if self._scoring_fingerprint is None:
+            templates = "\0".join([
+                str(AI_PROMPT_VERSION),
+                self.ai.model_name,
+                self.SCORING_SYSTEM_INSTRUCTION,
+                self.SCORING_PROMPT,
+                self.BATCH_SCORING_PROMPT
+            ])
+            self._scoring_fingerprint = hashlib.sha256(templates.encode()).hexdigest()[:16]
+        return self._scoring_fingerprint
+    
+    def _ai_cache_key(self, lead: Dict) -> str:
+        """
+        Content-addressed cache key for a lead's AI analysis
+        
+        Hashes the lead's identity and every field the scoring prompt sees,
+        so re-scrapes of an unchanged place hit the cache while any change
+        to the lead, the prompt templates or the model is a miss.
+        """
+        inputs = json.dumps(
+            {field: lead.get(field) for field in self.SCORING_FIELDS},
+            sort_keys=True,
+            default=str
+        )
+        digest = hashlib.sha256(f"{self._prompt_fingerprint()}:{inputs}".encode()).hexdigest()
+        return f"ai_analysis:{digest}"
+    
+    def _score_lead(self, lead: Dict) -> Optional[Dict]:
+        """
+        Score a single lead with its own AI request
+        
+        Returns:
+            Validated analysis, or None if the response could not be parsed
+        """
+        # Only the per-lead fields are sent; the shared context is the system instruction
+        context = self.SCORING_PROMPT.format(
+            name=lead['name'],
+            category=lead['category'],
+            city=lead['city'],
+            state=lead['state'],
+            website=lead['website'],
+            rating=lead['rating'],
+            review_count=lead['review_count'],
+            phone=lead['phone']
+        )
+        
+        try:
+            return self._parse_ai_analysis(json.loads(self._call_ai(context)))
+        except json.JSONDecodeError as e:
+            logger.warning(f"Failed to parse AI JSON response: {e}")
+            return None
+    
+    def _score_leads_batch(self, leads: List[Dict]) -> Optional[Dict[str, Dict]]:
+        """
+        Score several leads with one AI request
+        
+        The per-lead fields are sent once as a JSON list and the model returns an array
+        keyed by each lead's place_id (or its position when it has none). A failed
+        request is retried once after BATCH_RETRY_DELAY seconds, except quota
+        errors (429 / ResourceExhausted), which an immediate retry can't fix.
+        
+        Returns:
+            Validated analyses keyed by lead reference; leads that are
+            missing or malformed in the response are simply absent.
+            None if the request itself failed.
+        """
+        refs = [lead.get('place_id') or f"lead-{i}" for i, lead in enumerate(leads)]
+        organizations = [
+            {
+                'id': ref,
+                'organization': lead['name'],
+                'segment': lead['category'],
+                'location': f"{lead['city']}, {lead['state']}",
+                'website': lead['website'],
+                'reputation': f"{lead['rating']}/5 ({lead['review_count']} reviews)",
+                'contact': lead['phone']
+            }
+            for ref, lead in zip(refs, leads)
+        ]
+        
+        context = self.BATCH_SCORING_PROMPT.format(
+            count=len(leads),
+            organizations=json.dumps(organizations, indent=1)
+        )
+        
+        response_text = None
+        for attempt in range(2):
+            try:
+                response_text = self._call_ai(context)
+                break
+            except Exception as e:
+                logger.warning(f"Batched AI scoring failed (attempt {attempt + 1}/2): {e}")
+                if attempt or self.ai._is_quota_error(e):
+                    return None
+                time.sleep(self.BATCH_RETRY_DELAY)
+        
+        try:
+            items = json.loads(response_text)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Failed to parse batched AI JSON response: {e}")
+            return {}
+        
+        if not isinstance(items, list):
+            logger.warning("Batched AI response was not a JSON array")
+            return {}
+        
+        wanted = set(refs)
+        results = {}
+        for item in items:
+            if not isinstance(item, dict) or item.get('id') not in wanted:
+                continue
+            analysis = self._parse_ai_analysis(item)
+            if analysis:
+                results[item['id']] = analysis
+        
+        if len(results) < len(leads):
+            logger.warning(f"Batched AI scoring returned {len(results)}/{len(leads)} usable results")
+        
+        return results
+    
     def _add_ai_intelligence(self, lead: Dict) -> Dict:
         """
         Add AI-powered insights and lead scoring
@@ -278,144 +606,145 @@ class LeadGenerator:
         Returns:
             Lead with AI insights added
         """
+        return self._add_ai_intelligence_batch([lead])[0]
+    
+    def _add_ai_intelligence_batch(self, leads: List[Dict], refresh: bool = False) -> List[Dict]:
+        """
+        Add AI-powered insights and lead scoring to a group of leads
+        
+        Cache misses are scored together in one request; any lead the
+        batched response does not cover falls back to its own request.
+        If the batched request fails outright, the uncovered leads get the
+        neutral manual-review score instead of one request each.
+        
+        Args:
+            leads: Lead dictionaries (updated in place)
+            refresh: Skip cache lookups (fresh results still overwrite the cache)
+        
+        Returns:
+            The same leads with AI insights added
+        """
         start_time = time.time()
         
-        try:
-            # Rate limiting for AI calls
-            self.ai_limiter.wait_if_needed('google_ai')
-            
-            # Check cache for similar leads
-            cache_key = f"ai_analysis:{lead.get('category', '')}:{lead.get('city', '')}:{lead.get('rating', 0)}"
-            cached_analysis = self.cache.get(cache_key, ttl=7200)  # 2 hour cache
-            
+        # Check cache for this exact lead and prompt
+        pending = []
+        for lead in leads:
+            cached_analysis = None if refresh else self.cache.get(self._ai_cache_key(lead), ttl=AI_ANALYSIS_CACHE_TTL)
             if cached_analysis:
                 logger.debug(f"Using cached AI analysis for {lead.get('name')}")
-                lead['ai_lead_score'] = cached_analysis.get('score', 50)
-                lead['ai_insights'] = json.dumps(cached_analysis.get('insights', []))
-                lead['ai_concerns'] = json.dumps(cached_analysis.get('concerns', []))
-                lead['recommended_services'] = json.dumps(cached_analysis.get('recommended_services', []))
+                self._apply_ai_analysis(lead, cached_analysis)
             else:
-                model = genai.GenerativeModel('gemini-2.0-flash-exp')
-                
-                # Create context for AI
-                context = f"""
-                You are the strategic intelligence analyst for Eleven Views, a boutique production house expanding into elite sports management.
-                
-                Evaluate the following organization as a potential Eleven Views partner or client:
-                
-                Organization: {lead['name']}
-                Segment: {lead['category']}
-                Location: {lead['city']}, {lead['state']}
-                Website: {lead['website']}
-                Public Reputation: {lead['rating']}/5 ({lead['review_count']} reviews)
-                Primary Contact: {lead['phone']}
-                
-                Your assessment must help Eleven Views prioritize deals that need:
-                - Luxury content production and storytelling
-                - Athlete representation and NIL strategy
-                - Sponsorship packaging or hospitality experiences
-                - Media operations, live capture, or event coverage
-                
-                Tasks:
-                1. Score their partnership potential from 0-100 (focus on appetite for premium production + sports management support).
-                2. Share 2-3 insight bullets highlighting high-leverage ways Eleven Views could create value.
-                3. Flag any risks, readiness issues, or credibility concerns.
-                4. Suggest 2-3 Eleven Views service lanes that best match their needs (e.g., "Signature docuseries", "Athlete brand suite", "Game-day hybrid production").
-                
-                Respond in JSON format:
-                {{
-                    "score": <0-100>,
-                    "insights": ["insight 1", "insight 2", "insight 3"],
-                    "concerns": ["concern 1"],
-                    "recommended_services": ["service 1", "service 2"]
-                }}
-                """
-                
-                ai_start = time.time()
-                response = model.generate_content(context)
-                ai_duration = (time.time() - ai_start) * 1000
-                
-                # Estimate cost (Gemini 2.0 Flash pricing)
-                tokens_estimated = len(context.split()) * 1.3  # Rough estimate
-                cost = (tokens_estimated / 1000) * 0.000075  # $0.075 per 1M tokens
+                pending.append(lead)
+        
+        batch_results = self._score_leads_batch(pending) if len(pending) > 1 else {}
+        
+        for i, lead in enumerate(pending):
+            try:
+                if batch_results is None:
+                    self._apply_basic_score(lead)
+                    continue
                 
-                log_ai_request(
-                    model='gemini-2.0-flash-exp',
-                    tokens_used=int(tokens_estimated),
-                    duration_ms=ai_duration,
-                    cost=cost
-                )
+                analysis = batch_results.get(lead.get('place_id') or f"lead-{i}")
+                if analysis is None:
+                    analysis = self._score_lead(lead)
                 
-                # Parse AI response
-                try:
-                    response_text = response.text.strip()
-                    # Clean JSON response
-                    response_text = response_text.replace('```json', '').replace('```', '').strip()
-                    ai_data = json.loads(response_text)
-                    
-                    lead['ai_lead_score'] = ai_data.get('score', 50)
-                    lead['ai_insights'] = json.dumps(ai_data.get('insights', []))
-                    lead['ai_concerns'] = json.dumps(ai_data.get('concerns', []))
-                    lead['recommended_services'] = json.dumps(ai_data.get('recommended_services', []))
+                if analysis:
+                    self._apply_ai_analysis(lead, analysis)
                     
                     # Cache the analysis
-                    self.cache.set(cache_key, ai_data, ttl=7200)
-                    
-                except json.JSONDecodeError as e:
-                    logger.warning(f"Failed to parse AI JSON response: {e}")
-                    # Fallback scoring based on simple heuristics
-                    score = 55  # Elevated base score to reflect boutique targeting
-                    score += min(lead['rating'] * 8, 32)  # Reputation boost
-                    score += min(lead['review_count'] / 15, 18)  # Public proof boost
-                    if lead['website']: score += 8  # Digital presence
-                    if not lead.get('is_claimed', True): score += 7  # Operational gap Eleven Views can solve
-                    
-                    lead['ai_lead_score'] = min(score, 100)
-                    lead['ai_insights'] = json.dumps([
-                        f"Reputation: {lead['rating']}/5 with {lead['review_count']} social proofs",
-                        "Active digital presence" if lead['website'] else "Opportunity: elevate digital storytelling",
-                        "Ownership signals room for managed experience" if not lead.get('is_claimed', True) else "Claimed listing shows structured operations"
-                    ])
-            
-            # Generate personalized outreach message (outside cache check)
-            if lead.get('ai_lead_score', 0) >= 60:
+                    self.cache.set(self._ai_cache_key(lead), analysis, ttl=AI_ANALYSIS_CACHE_TTL)
+                else:
+                    self._apply_heuristic_score(lead)
+            except Exception as e:
+                logger.error(f"AI enrichment failed for {lead.get('name', 'Unknown')}: {e}", exc_info=True)
+                self._apply_basic_score(lead)
+        
+        # Generate personalized outreach messages (outside cache check)
+        for lead in leads:
+            if (lead.get('ai_lead_score') or 0) >= 60:
                 try:
                     lead['ai_outreach_message'] = self.personalizer.generate_outreach(lead)
                 except Exception as e:
                     logger.warning(f"Failed to generate outreach message: {e}")
+        
+        duration = time.time() - start_time
+        logger.debug(f"AI enrichment completed in {duration:.2f}s for {len(leads)} leads")
+        
+        return leads
+    
+    def _save_enriched_batch(
+        self,
+        enriched_leads: List[Dict],
+        stats: Dict,
+        auto_qualify: bool,
+        min_score: int
+    ):
+        """Save a batch of enriched leads in one transaction and tally the outcomes"""
+        if not enriched_leads:
+            return
+        
+        results = self.db.save_leads(
+            enriched_leads,
+            qualify_min_score=min_score if auto_qualify else None
+        )
+        
+        for enriched_lead, result in zip(enriched_leads, results):
+            lead_name = enriched_lead.get('name') or enriched_lead.get('title', 'Unknown')
+            score = enriched_lead.get('ai_lead_score', 0)
             
-            duration = time.time() - start_time
-            logger.debug(f"AI enrichment completed in {duration:.2f}s for {lead.get('name')}")
-            
-            return lead
-            
-        except Exception as e:
-            logger.error(f"AI enrichment failed for {lead.get('name', 'Unknown')}: {e}", exc_info=True)
-            # Return with basic scoring
-            lead['ai_lead_score'] = 50
-            lead['ai_insights'] = json.dumps(["Basic lead - manual review needed"])
-            return lead
+            if result['outcome'] == 'inserted':
+                stats['saved'] += 1
+                stats['lead_ids'].append(result['id'])
+                
+                if result['status'] == 'qualified':
+                    stats['qualified'] += 1
+                    logger.info(f"✅ {lead_name}: Saved & Qualified (Score: {score})")
+                else:
+                    logger.info(f"✅ {lead_name}: Saved (Score: {score})")
+            elif result['outcome'] == 'error':
+                stats['errors'] += 1
+                logger.error(f"❌ Error saving lead {lead_name}")
+            else:
+                stats['duplicates'] += 1
+                logger.debug(f"⚠️  {lead_name}: Duplicate (skipped)")
     
     def process_leads(
         self,
         search_query: str,
         max_results: int = 100,
         auto_qualify: bool = True,
-        min_score: int = 60
+        min_score: int = 60,
+        concurrency: Optional[int] = None,
+        ai_batch_size: Optional[int] = None,
+        refresh_ai: bool = False,
+        serve_stale: bool = False
     ) -> Dict:
         """
         Complete lead generation pipeline
         
+        Leads are enriched in chunks of ai_batch_size (one AI scoring request
+        per chunk) by a pool of worker threads (network-bound email and AI
+        calls, paced by the shared rate limiters). The calling thread
+        is the single database writer: it drains results in scrape order,
+        so log output and stats match a sequential run.
+        
         Args:
             search_query: What to search for
             max_results: How many leads to generate
             auto_qualify: Automatically qualify leads above min_score
             min_score: Minimum AI score for auto-qualification
+            concurrency: Enrichment workers (defaults to ENRICHMENT_CONCURRENCY)
+            ai_batch_size: Leads per AI scoring request (defaults to AI_SCORING_BATCH_SIZE)
+            refresh_ai: Re-score leads even if a cached AI analysis exists
+            serve_stale: Use stale cached search results immediately and
+                refresh them in the background (see scrape_google_maps)
         
         Returns:
             Summary statistics
         """
         start_time = time.time()
+        concurrency = max(1, concurrency or ENRICHMENT_CONCURRENCY)
+        ai_batch_size = max(1, ai_batch_size or AI_SCORING_BATCH_SIZE)
         
         logger.info("="*60)
         logger.info("🚀 ELEVEN VIEWS OPPORTUNITY ENGINE")
@@ -426,14 +755,14 @@ class LeadGenerator:
         logger.info("="*60)
         
         # Step 1: Scrape
-        raw_leads = self.scrape_google_maps(search_query, max_results)
+        raw_leads, served_stale = self._scrape_google_maps(search_query, max_results, serve_stale=serve_stale)
         
         if not raw_leads:
             logger.warning("No leads found. Check your search query.")
-            return {'success': False, 'leads_generated': 0}
+            return {'success': False, 'leads_generated': 0, 'served_stale': served_stale}
         
         # Step 2: Enrich and save
-        logger.info(f"Enriching {len(raw_leads)} leads with AI...")
+        logger.info(f"Enriching {len(raw_leads)} leads with AI ({concurrency} workers)...")
         
         stats = {
             'total_scraped': len(raw_leads),
@@ -441,37 +770,40 @@ class LeadGenerator:
             'qualified': 0,
             'duplicates': 0,
             'errors': 0,
+            'lead_ids': [],
+            'served_stale': served_stale,
             'success': True
         }
         
-        for idx, raw_lead in enumerate(raw_leads, 1):
-            try:
-                lead_name = raw_lead.get('title', 'Unknown')
-                logger.debug(f"Processing {idx}/{len(raw_leads)}: {lead_name}")
-                
-                # Enrich with AI
-                enriched_lead = self.enrich_lead(raw_lead)
-                
-                # Save to database
-                lead_id = self.db.save_lead(enriched_lead)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='enrich') as executor:
+            chunks = [
+                raw_leads[i:i + ai_batch_size]
+                for i in range(0, len(raw_leads), ai_batch_size)
+            ]
+            futures = [executor.submit(self.enrich_leads, chunk, refresh_ai) for chunk in chunks]
+            
+            pending = []
+            idx = 0
+            for chunk, future in zip(chunks, futures):
+                try:
+                    # Enrich with AI (waits for this chunk's worker)
+                    enriched = future.result()
+                except Exception as e:
+                    stats['errors'] += len(chunk)
+                    idx += len(chunk)
+                    logger.error(f"❌ Error processing {len(chunk)} leads: {e}", exc_info=True)
+                    continue
                 
-                if lead_id:
-                    stats['saved'] += 1
+                for raw_lead, lead in zip(chunk, enriched):
+                    idx += 1
+                    logger.debug(f"Processed {idx}/{len(raw_leads)}: {raw_lead.get('title', 'Unknown')}")
+                    pending.append(lead)
                     
-                    # Auto-qualify if score is high enough
-                    if auto_qualify and enriched_lead.get('ai_lead_score', 0) >= min_score:
-                        self.db.update_lead_status(lead_id, 'qualified')
-                        stats['qualified'] += 1
-                        logger.info(f"✅ {lead_name}: Saved & Qualified (Score: {enriched_lead.get('ai_lead_score', 0)})")
-                    else:
-                        logger.info(f"✅ {lead_name}: Saved (Score: {enriched_lead.get('ai_lead_score', 0)})")
-                else:
-                    stats['duplicates'] += 1
-                    logger.debug(f"⚠️  {lead_name}: Duplicate (skipped)")
-                    
-            except Exception as e:
-                stats['errors'] += 1
-                logger.error(f"❌ Error processing lead {raw_lead.get('title', 'Unknown')}: {e}", exc_info=True)
+                    if len(pending) >= self.SAVE_BATCH_SIZE:
+                        self._save_enriched_batch(pending, stats, auto_qualify, min_score)
+                        pending = []
+            
+            self._save_enriched_batch(pending, stats, auto_qualify, min_score)
         
         # Log summary
         duration = time.time() - start_time
@@ -506,6 +838,9 @@ def main():
     parser.add_argument('--limit', type=int, default=100, help='Max results')
     parser.add_argument('--min-score', type=int, default=60, help='Min AI score for qualification')
     parser.add_argument('--min-rating', type=float, default=3.5, help='Min Google rating')
+    parser.add_argument('--concurrency', type=int, default=ENRICHMENT_CONCURRENCY, help='Parallel enrichment workers')
+    parser.add_argument('--ai-batch-size', type=int, default=AI_SCORING_BATCH_SIZE, help='Leads scored per AI request')
+    parser.add_argument('--refresh-ai', action='store_true', help='Ignore cached AI analyses and re-score every lead')
     
     args = parser.parse_args()
     
@@ -514,7 +849,10 @@ def main():
     stats = generator.process_leads(
         search_query=args.search,
         max_results=args.limit,
-        min_score=args.min_score
+        min_score=args.min_score,
+        concurrency=args.concurrency,
+        ai_batch_size=args.ai_batch_size,
+        refresh_ai=args.refresh_ai
     )
     
     if stats['qualified'] > 0:
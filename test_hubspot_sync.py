@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+HubSpot batch sync - duplicate email test
+Syncs the same leads twice against a fake HubSpot client and checks that a
+lead sharing another lead's email never updates that lead's contact.
+"""
+
+import os
+import sys
+import types
+import tempfile
+import unittest
+from unittest import mock
+
+from database import Database
+from integrations.hubspot import HubSpotIntegration
+from utils.rate_limiter import RateLimiter
+
+class _Obj:
+    """Attribute bag standing in for HubSpot SDK models"""
+    
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+def _fake_contacts_module() -> types.ModuleType:
+    """hubspot.crm.contacts with every model the sync imports"""
+    module = types.ModuleType('hubspot.crm.contacts')
+    for name in [
+        'BatchReadInputSimplePublicObjectId', 'SimplePublicObjectId',
+        'BatchInputSimplePublicObjectInputForCreate', 'SimplePublicObjectInputForCreate',
+        'BatchInputSimplePublicObjectBatchInput', 'SimplePublicObjectBatchInput',
+        'SimplePublicObjectInput', 'Filter', 'FilterGroup'
+    ]:
+        setattr(module, name, type(name, (_Obj,), {}))
+    return module
+
+class FakeBatchApi:
+    """In-memory HubSpot contacts batch API, deduping contacts on email"""
+    
+    def __init__(self):
+        self.contacts = {}  # contact ID -> properties
+        self.updated = []  # (contact ID, properties) per updated contact
+    
+    def _id_for(self, email: str):
+        return next((cid for cid, props in self.contacts.items() if props.get('email') == email), None)
+    
+    def read(self, batch_read_input_simple_public_object_id):
+        results = []
+        for item in batch_read_input_simple_public_object_id.inputs:
+            contact_id = self._id_for(item.id)
+            if contact_id:
+                results.append(_Obj(id=contact_id, properties={'email': item.id}))
+        return _Obj(results=results, errors=[])
+    
+    def create(self, batch_input_simple_public_object_input_for_create):
+        results = []
+        for item in batch_input_simple_public_object_input_for_create.inputs:
+            contact_id = str(len(self.contacts) + 1)
+            self.contacts[contact_id] = dict(item.properties)
+            results.append(_Obj(id=contact_id, properties=dict(item.properties)))
+        return _Obj(results=results, errors=[])
+    
+    def update(self, batch_input_simple_public_object_batch_input):
+        results = []
+        for item in batch_input_simple_public_object_batch_input.inputs:
+            self.contacts[item.id].update(item.properties)
+            self.updated.append((item.id, dict(item.properties)))
+            results.append(_Obj(id=item.id))
+        return _Obj(results=results, errors=[])
+
+class TestDuplicateEmailSync(unittest.TestCase):
+    """Leads sharing an email are handled the same way on every run"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        
+        contacts_module = _fake_contacts_module()
+        modules = mock.patch.dict(sys.modules, {
+            'hubspot': types.ModuleType('hubspot'),
+            'hubspot.crm': types.ModuleType('hubspot.crm'),
+            'hubspot.crm.contacts': contacts_module
+        })
+        modules.start()
+        self.addCleanup(modules.stop)
+        
+        self.batch_api = FakeBatchApi()
+        self.hubspot = HubSpotIntegration.__new__(HubSpotIntegration)
+        self.hubspot.enabled = True
+        self.hubspot.client = _Obj(crm=_Obj(contacts=_Obj(batch_api=self.batch_api, basic_api=None)))
+        self.hubspot.rate_limiter = RateLimiter(max_calls=1000, period=1.0)
+        self.hubspot.db = Database(os.path.join(self.tmp.name, 'leads.db'))
+    
+    def tearDown(self):
+        self.hubspot.db.close()
+        self.tmp.cleanup()
+    
+    def test_duplicate_email_never_overwrites_other_leads_contact(self):
+        leads = [
+            {'id': 1, 'name': 'First Club', 'email': 'shared@example.com', 'city': 'Austin'},
+            {'id': 2, 'name': 'Second Club', 'email': 'SHARED@example.com', 'city': 'Dallas'},
+            {'id': 3, 'name': 'Third Club', 'email': 'third@example.com', 'city': 'Houston'}
+        ]
+        
+        first = self.hubspot.sync_leads_batch(leads)
+        self.assertEqual([r['action'] for r in first['results']], ['created', 'skipped', 'created'])
+        
+        second = self.hubspot.sync_leads_batch(leads)
+        self.assertEqual([r['action'] for r in second['results']], ['unchanged', 'skipped', 'unchanged'])
+        self.assertEqual(second['updated'], 0)
+        self.assertEqual(self.batch_api.updated, [])
+        
+        # A real change to the owning lead still updates its own contact
+        leads[0]['city'] = 'San Antonio'
+        third = self.hubspot.sync_leads_batch(leads)
+        self.assertEqual([r['action'] for r in third['results']], ['updated', 'skipped', 'unchanged'])
+        self.assertEqual([contact_id for contact_id, _ in self.batch_api.updated], [first['results'][0]['contact_id']])
+
+
+if __name__ == '__main__':
+    unittest.main()
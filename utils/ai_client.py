@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Shared Google Gemini client
+One configured model per system instruction, shared rate limiting and
+token/cost logging from the response usage metadata
+"""
+
+import os
+import time
+from threading import Lock
+from typing import Dict, Optional
+import google.generativeai as genai
+from dotenv import load_dotenv
+from utils.logger import get_logger, log_ai_request
+from utils.rate_limiter import get_rate_limiter
+from config import AI_MODEL
+
+load_dotenv()
+
+logger = get_logger('ai_client')
+
+class AIClient:
+    """Thread-safe owner of Gemini model instances"""
+    
+    # Gemini 2.0 Flash pricing (USD per 1M tokens)
+    INPUT_COST_PER_M = 0.075
+    OUTPUT_COST_PER_M = 0.30
+    
+    def __init__(self, model_name: str = AI_MODEL, api_key: Optional[str] = None):
+        """
+        Initialize AI client
+        
+        Args:
+            model_name: Gemini model to use (defaults to config.AI_MODEL)
+            api_key: Google AI API key (defaults to GOOGLE_API_KEY)
+        """
+        self.model_name = model_name
+        genai.configure(api_key=api_key or os.getenv('GOOGLE_API_KEY'))
+        
+        # Models are keyed by system instruction so the static prompt
+        # prefix is set up once and only per-call fields are sent
+        self._models: Dict[Optional[str], genai.GenerativeModel] = {}
+        self._lock = Lock()
+        self.limiter = get_rate_limiter('google_ai', max_calls=60, period=60.0)
+    
+    def get_model(self, system_instruction: Optional[str] = None) -> genai.GenerativeModel:
+        """
+        Get (or create) the model for a system instruction
+        
+        Args:
+            system_instruction: Static prompt prefix, or None for a bare model
+        
+        Returns:
+            Shared GenerativeModel instance
+        """
+        with self._lock:
+            model = self._models.get(system_instruction)
+            if model is None:
+                if system_instruction:
+                    model = genai.GenerativeModel(self.model_name, system_instruction=system_instruction)
+                else:
+                    model = genai.GenerativeModel(self.model_name)
+                self._models[system_instruction] = model
+            return model
+    
+    def generate(self, prompt: str, system_instruction: Optional[str] = None) -> str:
+        """
+        Generate a response under the shared google_ai rate limit
+        
+        Args:
+            prompt: Per-call prompt text
+            system_instruction: Static prompt prefix for the model
+        
+        Returns:
+            Stripped response text
+        """
+        model = self.get_model(system_instruction)
+        
+        # Rate limiting for AI calls
+        self.limiter.wait_if_needed('google_ai')
+        
+        start = time.time()
+        try:
+            response = model.generate_content(prompt)
+        except Exception as e:
+            log_ai_request(
+                model=self.model_name,
+                tokens_used=0,
+                duration_ms=(time.time() - start) * 1000,
+                cost=0.0,
+                error=str(e)
+            )
+            if self._is_quota_error(e):
+                self.limiter.record_throttle('google_ai')
+            raise
+        duration = (time.time() - start) * 1000
+        self.limiter.record_success('google_ai')
+        
+        prompt_tokens, output_tokens = self._token_usage(response, prompt, system_instruction)
+        cost = (
+            prompt_tokens * self.INPUT_COST_PER_M +
+            output_tokens * self.OUTPUT_COST_PER_M
+        ) / 1_000_000
+        
+        log_ai_request(
+            model=self.model_name,
+            tokens_used=prompt_tokens + output_tokens,
+            duration_ms=duration,
+            cost=cost
+        )
+        
+        return response.text.strip()
+    
+    @staticmethod
+    def _is_quota_error(error: Exception) -> bool:
+        """Whether an SDK error is a 429 / ResourceExhausted quota response"""
+        return type(error).__name__ == 'ResourceExhausted' or getattr(error, 'code', None) == 429
+    
+    def _token_usage(self, response, prompt: str, system_instruction: Optional[str]) -> tuple:
+        """
+        Read (prompt, output) token counts from the response metadata
+        
+        Falls back to a word-count estimate if the SDK did not report usage.
+        """
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None)
+        output_tokens = getattr(usage, 'candidates_token_count', None)
+        
+        if prompt_tokens is None:
+            text = f"{system_instruction or ''} {prompt}"
+            prompt_tokens = int(len(text.split()) * 1.3)  # Rough estimate
+        if output_tokens is None:
+            try:
+                output_tokens = int(len(response.text.split()) * 1.3)
+            except Exception:
+                output_tokens = 0
+        
+        return int(prompt_tokens), int(output_tokens)
+
+# Global AI client instance
+_ai_client = None
+
+def get_ai_client() -> AIClient:
+    """Get AI client instance"""
+    global _ai_client
+    if _ai_client is None:
+        _ai_client = AIClient()
+    return _ai_client
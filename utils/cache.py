@@ -4,34 +4,270 @@ Caching system for API responses and AI results
 Reduces API costs and improves performance
 """
 
+import os
 import json
+import pickle
+import sqlite3
+import zlib
 import hashlib
 import time
-from typing import Optional, Any, Dict
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import Lock, Event, Thread, local, get_ident
+from typing import Optional, Any, Callable, Dict, Tuple
 from pathlib import Path
 from functools import wraps
 from utils.logger import get_logger
+from config import (
+    CACHE_BACKEND, CACHE_DB_PATH, CACHE_MAX_BYTES, CACHE_SWEEP_INTERVAL,
+    CACHE_MEMORY_MAX_ENTRIES, CACHE_MEMORY_MAX_BYTES, CACHE_REFRESH_WORKERS,
+    CACHE_SERIALIZER, CACHE_COMPRESSION
+)
 
 logger = get_logger('cache')
 
+# Cross-process single-flight needs POSIX file locks; without them
+# get_or_compute still coalesces callers within a process
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Optional faster serialization/compression
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+class CacheSerializer:
+    """
+    Encode cache payloads as bytes with a small format header
+    
+    Header: MAGIC + serializer id + compression id. Data without the magic
+    prefix is read as plain JSON, so entries from older versions still load.
+    
+    Pickle is opt-in: unpickling runs arbitrary code, so it is only safe when
+    nothing but this application can write to the cache directory or
+    database. Pickled entries are refused unless format='pickle'.
+    """
+    
+    MAGIC = b'EVC\x01'
+    
+    # Payloads smaller than this are stored uncompressed
+    COMPRESS_MIN_BYTES = 1024
+    
+    FORMATS = {'json': b'j', 'pickle': b'p', 'msgpack': b'm'}
+    COMPRESSIONS = {'none': b'-', 'zlib': b'z', 'zstd': b's'}
+    
+    def __init__(self, format: str = CACHE_SERIALIZER, compression: str = CACHE_COMPRESSION):
+        """
+        Initialize serializer
+        
+        Args:
+            format: 'msgpack', 'json' or 'pickle' (trusted caches only)
+            compression: 'zlib', 'zstd' or 'none'
+        """
+        if format not in self.FORMATS:
+            logger.warning(f"Unknown cache serializer '{format}', using json")
+            format = 'json'
+        if format == 'msgpack' and msgpack is None:
+            logger.warning("msgpack not installed, using json for cache entries")
+            format = 'json'
+        
+        if compression not in self.COMPRESSIONS:
+            logger.warning(f"Unknown cache compression '{compression}', using zlib")
+            compression = 'zlib'
+        if compression == 'zstd' and zstandard is None:
+            logger.warning("zstandard not installed, using zlib for cache entries")
+            compression = 'zlib'
+        
+        self.format = format
+        self.compression = compression
+    
+    def dumps(self, value: Any) -> bytes:
+        """Serialize (and maybe compress) a value"""
+        return self.dumps_sized(value)[0]
+    
+    def dumps_sized(self, value: Any) -> Tuple[bytes, int]:
+        """
+        Serialize (and maybe compress) a value
+        
+        Returns:
+            (encoded data, uncompressed payload size)
+        """
+        if self.format == 'pickle':
+            payload = pickle.dumps(value, protocol=5)
+        elif self.format == 'msgpack':
+            payload = msgpack.packb(value, use_bin_type=True)
+        else:
+            payload = json.dumps(value).encode('utf-8')
+        
+        size = len(payload)
+        compression = self.compression
+        if compression == 'none' or size < self.COMPRESS_MIN_BYTES:
+            compression = 'none'
+        elif compression == 'zstd':
+            payload = zstandard.ZstdCompressor(level=3).compress(payload)
+        else:
+            payload = zlib.compress(payload, 1)
+        
+        return self.MAGIC + self.FORMATS[self.format] + self.COMPRESSIONS[compression] + payload, size
+    
+    def loads(self, data) -> Any:
+        """Deserialize data written by dumps, or legacy plain JSON"""
+        return self.loads_sized(data)[0]
+    
+    def loads_sized(self, data) -> Tuple[Any, int]:
+        """
+        Deserialize data written by dumps, or legacy plain JSON
+        
+        Returns:
+            (value, uncompressed payload size)
+        """
+        if isinstance(data, str):
+            return json.loads(data), len(data)
+        if not data.startswith(self.MAGIC):
+            return json.loads(data.decode('utf-8')), len(data)
+        
+        header = len(self.MAGIC)
+        format_id = data[header:header + 1]
+        compression_id = data[header + 1:header + 2]
+        payload = data[header + 2:]
+        
+        if compression_id == self.COMPRESSIONS['zlib']:
+            payload = zlib.decompress(payload)
+        elif compression_id == self.COMPRESSIONS['zstd']:
+            if zstandard is None:
+                raise ValueError("Cache entry is zstd-compressed but zstandard is not installed")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        
+        if format_id == self.FORMATS['pickle']:
+            if self.format != 'pickle':
+                raise ValueError("Cache entry is pickled but CACHE_SERIALIZER is not 'pickle'")
+            return pickle.loads(payload), len(payload)
+        if format_id == self.FORMATS['msgpack']:
+            if msgpack is None:
+                raise ValueError("Cache entry is msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False), len(payload)
+        return json.loads(payload), len(payload)
+
+class MemoryTier:
+    """Thread-safe in-process LRU of cache records, bounded by entries and bytes"""
+    
+    def __init__(self, max_entries: int, max_bytes: int):
+        """
+        Initialize memory tier
+        
+        Args:
+            max_entries: Maximum number of records held
+            max_bytes: Maximum total uncompressed size of held records
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._records = OrderedDict()  # key -> (record, size)
+        self._lock = Lock()
+    
+    def __len__(self) -> int:
+        return len(self._records)
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Get a record and mark it most recently used"""
+        with self._lock:
+            entry = self._records.get(key)
+            if entry is None:
+                return None
+            self._records.move_to_end(key)
+            return entry[0]
+    
+    def set(self, key: str, record: Dict, size: int):
+        """Store a record, evicting least recently used entries to fit"""
+        with self._lock:
+            self._pop(key)
+            if size > self.max_bytes or self.max_entries <= 0:
+                return
+            self._records[key] = (record, size)
+            self.bytes += size
+            while len(self._records) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted_size) = self._records.popitem(last=False)
+                self.bytes -= evicted_size
+    
+    def delete(self, key: str):
+        """Drop a record"""
+        with self._lock:
+            self._pop(key)
+    
+    def clear(self):
+        """Drop all records"""
+        with self._lock:
+            self._records.clear()
+            self.bytes = 0
+    
+    def _pop(self, key: str):
+        entry = self._records.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+
 class Cache:
-    """Simple file-based cache with TTL"""
+    """
+    Two-tier cache with TTL: an in-process LRU in front of a file store
+    
+    Reads check memory first and fall through to the store, promoting hits
+    into memory. Writes go to both tiers. Values held in memory are shared
+    between callers, so treat cached values as read-only.
+    
+    Subclasses change the persistent tier by overriding the _store_* hooks.
+    """
+    
+    # Seconds get_or_compute waits on another process's computation before
+    # giving up and computing the value itself
+    LOCK_TIMEOUT = 600
     
-    def __init__(self, cache_dir: str = "cache", default_ttl: int = 3600):
+    def __init__(
+        self,
+        cache_dir: str = "cache",
+        default_ttl: int = 3600,
+        memory_entries: int = CACHE_MEMORY_MAX_ENTRIES,
+        memory_bytes: int = CACHE_MEMORY_MAX_BYTES,
+        serializer: Optional[CacheSerializer] = None
+    ):
         """
         Initialize cache
         
         Args:
             cache_dir: Directory for cache files
             default_ttl: Default time-to-live in seconds (1 hour)
+            memory_entries: Max entries in the memory tier (0 disables it)
+            memory_bytes: Max uncompressed bytes in the memory tier
+            serializer: Entry encoding (defaults to CACHE_SERIALIZER/CACHE_COMPRESSION)
         """
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         self.default_ttl = default_ttl
+        self.memory = MemoryTier(memory_entries, memory_bytes)
+        self.serializer = serializer or CacheSerializer()
+        self._flights = {}  # key -> [Lock, callers] for in-flight computations
+        self._flights_lock = Lock()
+        self._refreshing = set()  # keys with a background refresh queued or running
+        self._refresh_executor = None
+        self._stats_lock = Lock()
         self._stats = {
             'hits': 0,
             'misses': 0,
-            'sets': 0
+            'sets': 0,
+            'coalesced': 0,
+            'stale_served': 0,
+            'refreshes': 0,
+            'memory_hits': 0,
+            'memory_misses': 0,
+            'disk_hits': 0,
+            'disk_misses': 0
         }
     
     def _get_key_path(self, key: str) -> Path:
@@ -40,6 +276,18 @@ class Cache:
         key_hash = hashlib.md5(key.encode()).hexdigest()
         return self.cache_dir / f"{key_hash}.json"
     
+    def _is_expired(self, record: Dict, ttl: int, now: float) -> bool:
+        """Check a record against the reader's TTL and the TTL it was written with"""
+        return now - record['timestamp'] > ttl or self._is_dead(record, ttl, now)
+    
+    def _is_dead(self, record: Dict, ttl: int, now: float) -> bool:
+        """Check whether a record is past the TTL it was written with"""
+        expires_at = record.get('expires_at')
+        if expires_at is None:
+            # Entries written before expires_at existed only have the reader's TTL
+            return now - record['timestamp'] > ttl
+        return now > expires_at
+    
     def get(self, key: str, ttl: Optional[int] = None) -> Optional[Any]:
         """
         Get value from cache
@@ -51,29 +299,47 @@ class Cache:
         Returns:
             Cached value or None if not found/expired
         """
+        record = self._get_record(key, ttl)
+        return record['value'] if record is not None else None
+    
+    def _get_record(self, key: str, ttl: Optional[int] = None) -> Optional[Dict]:
+        """Look up a record no older than ttl, memory tier first"""
         ttl = ttl or self.default_ttl
-        cache_file = self._get_key_path(key)
+        now = time.time()
         
-        if not cache_file.exists():
-            self._stats['misses'] += 1
-            return None
+        record = self.memory.get(key)
+        if record is not None:
+            if not self._is_expired(record, ttl, now):
+                self._count('memory_hits', 'hits')
+                return record
+            if self._is_dead(record, ttl, now):
+                self.memory.delete(key)
+        self._count('memory_misses')
         
         try:
-            with open(cache_file, 'r') as f:
-                data = json.load(f)
-            
-            # Check expiration
-            if time.time() - data['timestamp'] > ttl:
-                cache_file.unlink()  # Delete expired cache
-                self._stats['misses'] += 1
-                return None
-            
-            self._stats['hits'] += 1
-            return data['value']
+            stored = self._store_get(key)
         except Exception as e:
             logger.warning(f"Cache read error for {key}: {e}")
-            self._stats['misses'] += 1
+            stored = None
+        
+        if stored is None:
+            self._count('disk_misses', 'misses')
+            return None
+        
+        record, size = stored
+        
+        # Check expiration
+        if self._is_expired(record, ttl, now):
+            # Only delete entries past their own TTL; a stale-while-revalidate
+            # writer may still be serving ones that are merely too old for us
+            if self._is_dead(record, ttl, now):
+                self._store_delete(key)  # Delete expired cache
+            self._count('disk_misses', 'misses')
             return None
+        
+        self._count('disk_hits', 'hits')
+        self.memory.set(key, record, size)
+        return record
     
     def set(self, key: str, value: Any, ttl: Optional[int] = None):
         """
@@ -81,45 +347,541 @@ class Cache:
         
         Args:
             key: Cache key
-            value: Value to cache (must be JSON serializable)
+            value: Value to cache (JSON-compatible data)
             ttl: Override default TTL
         """
+        now = time.time()
+        record = {
+            'timestamp': now,
+            'expires_at': now + (ttl or self.default_ttl),
+            'value': value
+        }
+        
         try:
-            cache_file = self._get_key_path(key)
-            data = {
-                'timestamp': time.time(),
-                'value': value
-            }
-            
-            with open(cache_file, 'w') as f:
-                json.dump(data, f)
-            
-            self._stats['sets'] += 1
+            size = self._store_set(key, record)
         except Exception as e:
             logger.warning(f"Cache write error for {key}: {e}")
+            self.memory.delete(key)
+            return
+        
+        self.memory.set(key, record, size)
+        self._count('sets')
+    
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[int] = None,
+        store_ttl: Optional[int] = None
+    ) -> Optional[Any]:
+        """
+        Get value from cache, computing and caching it once on a miss
+        
+        Concurrent callers for the same key (threads in this process, and
+        other processes sharing the cache directory) wait for the first
+        caller's computation instead of repeating it.
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the value; a None
+                result is returned but not cached
+            ttl: Override default TTL
+            store_ttl: Expiry written with a computed value, if it should
+                outlive ttl (e.g. to be served stale later); defaults to ttl
+        
+        Returns:
+            Cached or freshly computed value
+        """
+        value = self.get(key, ttl)
+        if value is not None:
+            return value
+        
+        with self._flights_lock:
+            flight = self._flights.setdefault(key, [Lock(), 0])
+            flight[1] += 1
+        
+        try:
+            with flight[0]:
+                # Another thread may have filled it while we waited
+                value = self.get(key, ttl)
+                if value is not None:
+                    self._count('coalesced')
+                    return value
+                
+                with self._process_lock(key):
+                    # ...or another process
+                    value = self.get(key, ttl)
+                    if value is not None:
+                        self._count('coalesced')
+                        return value
+                    
+                    value = compute()
+                    if value is not None:
+                        self.set(key, value, store_ttl or ttl)
+                    return value
+        finally:
+            with self._flights_lock:
+                flight[1] -= 1
+                if flight[1] == 0:
+                    del self._flights[key]
+    
+    def get_or_revalidate(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None
+    ) -> Tuple[Optional[Any], bool]:
+        """
+        Stale-while-revalidate lookup
+        
+        Entries younger than ttl are returned as-is. Entries older than ttl
+        but younger than stale_ttl are returned immediately while compute
+        refreshes them in the background. Anything else is computed inline
+        (single-flight, like get_or_compute).
+        
+        Args:
+            key: Cache key
+            compute: Zero-argument function producing the value
+            ttl: Soft TTL - how long a value counts as fresh
+            stale_ttl: Hard TTL - how long a stale value may still be served
+        
+        Returns:
+            (value, served_stale)
+        """
+        ttl = ttl or self.default_ttl
+        stale_ttl = max(stale_ttl or ttl, ttl)
+        
+        record = self._get_record(key, stale_ttl)
+        if record is None:
+            return self.get_or_compute(key, compute, ttl=ttl, store_ttl=stale_ttl), False
+        
+        if time.time() - record['timestamp'] <= ttl:
+            return record['value'], False
+        
+        self._count('stale_served')
+        self._schedule_refresh(key, compute, ttl, stale_ttl)
+        return record['value'], True
+    
+    def _schedule_refresh(self, key: str, compute: Callable[[], Any], ttl: int, stale_ttl: int):
+        """Refresh a stale key in the background, at most once at a time per key"""
+        with self._flights_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(
+                    max_workers=CACHE_REFRESH_WORKERS,
+                    thread_name_prefix='cache-refresh'
+                )
+        
+        def refresh():
+            try:
+                with self._process_lock(key):
+                    # Another process may have refreshed it already
+                    record = self._get_record(key, ttl)
+                    if record is not None:
+                        return
+                    
+                    value = compute()
+                    if value is not None:
+                        self.set(key, value, stale_ttl)
+                        self._count('refreshes')
+            except Exception as e:
+                logger.warning(f"Background refresh failed for {key}: {e}")
+            finally:
+                with self._flights_lock:
+                    self._refreshing.discard(key)
+        
+        self._refresh_executor.submit(refresh)
+    
+    @contextmanager
+    def _process_lock(self, key: str):
+        """Hold an exclusive lock file for key across processes (best effort)"""
+        if fcntl is None:
+            yield
+            return
+        
+        lock_dir = self.cache_dir / 'locks'
+        lock_dir.mkdir(exist_ok=True)
+        key_hash = hashlib.md5(key.encode()).hexdigest()
+        lock_path = lock_dir / f"{key_hash}.lock"
+        
+        lock_file = None
+        deadline = time.time() + self.LOCK_TIMEOUT
+        while lock_file is None:
+            candidate = open(lock_path, 'a')
+            try:
+                fcntl.flock(candidate, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                candidate.close()
+                if time.time() >= deadline:
+                    logger.warning(f"Timed out waiting for cache lock on {key}, computing anyway")
+                    break
+                time.sleep(0.1)
+                continue
+            
+            # The previous holder unlinks the file on release; if we locked
+            # that unlinked file, open and lock the current one instead
+            try:
+                current_inode = os.stat(lock_path).st_ino
+            except FileNotFoundError:
+                current_inode = None
+            if current_inode == os.fstat(candidate.fileno()).st_ino:
+                lock_file = candidate
+            else:
+                candidate.close()
+        
+        try:
+            yield
+        finally:
+            if lock_file is not None:
+                # Unlink while still holding the lock so lock files don't pile up
+                lock_path.unlink(missing_ok=True)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
     
     def delete(self, key: str):
         """Delete cache entry"""
-        cache_file = self._get_key_path(key)
-        if cache_file.exists():
-            cache_file.unlink()
+        self.memory.delete(key)
+        self._store_delete(key)
     
     def clear(self):
         """Clear all cache entries"""
-        for cache_file in self.cache_dir.glob("*.json"):
-            cache_file.unlink()
+        self.memory.clear()
+        self._store_clear()
         logger.info("Cache cleared")
     
+    def _count(self, *counters: str):
+        """Increment stats counters"""
+        with self._stats_lock:
+            for counter in counters:
+                self._stats[counter] += 1
+    
     def get_stats(self) -> Dict:
-        """Get cache statistics"""
-        total = self._stats['hits'] + self._stats['misses']
-        hit_rate = (self._stats['hits'] / total * 100) if total > 0 else 0
+        """Get cache statistics, overall and per tier"""
+        with self._stats_lock:
+            counts = dict(self._stats)
+        total = counts['hits'] + counts['misses']
         
         return {
-            **self._stats,
-            'hit_rate': round(hit_rate, 2),
-            'total_requests': total
+            'hits': counts['hits'],
+            'misses': counts['misses'],
+            'sets': counts['sets'],
+            'coalesced': counts['coalesced'],
+            'stale_served': counts['stale_served'],
+            'refreshes': counts['refreshes'],
+            'hit_rate': self._hit_rate(counts['hits'], counts['misses']),
+            'total_requests': total,
+            'memory': {
+                'hits': counts['memory_hits'],
+                'misses': counts['memory_misses'],
+                'hit_rate': self._hit_rate(counts['memory_hits'], counts['memory_misses']),
+                'entries': len(self.memory),
+                'bytes': self.memory.bytes,
+                'max_entries': self.memory.max_entries,
+                'max_bytes': self.memory.max_bytes
+            },
+            'disk': {
+                'hits': counts['disk_hits'],
+                'misses': counts['disk_misses'],
+                'hit_rate': self._hit_rate(counts['disk_hits'], counts['disk_misses'])
+            }
         }
+    
+    def _hit_rate(self, hits: int, misses: int) -> float:
+        total = hits + misses
+        return round(hits / total * 100, 2) if total > 0 else 0
+    
+    # Persistent tier (one JSON file per key)
+    
+    def _store_get(self, key: str) -> Optional[Tuple[Dict, int]]:
+        """
+        Read a record from the persistent tier
+        
+        Returns:
+            (record, uncompressed size) or None if not stored
+        """
+        cache_file = self._get_key_path(key)
+        try:
+            with open(cache_file, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        return self.serializer.loads_sized(raw)
+    
+    def _store_set(self, key: str, record: Dict) -> int:
+        """
+        Write a record to the persistent tier
+        
+        Returns:
+            Uncompressed size in bytes
+        """
+        raw, size = self.serializer.dumps_sized(record)
+        cache_file = self._get_key_path(key)
+        
+        # Write to a temp file and rename so readers never see a partial entry
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.{get_ident()}.tmp")
+        with open(tmp_file, 'wb') as f:
+            f.write(raw)
+        os.replace(tmp_file, cache_file)
+        
+        return size
+    
+    def _store_delete(self, key: str):
+        """Delete a record from the persistent tier"""
+        self._get_key_path(key).unlink(missing_ok=True)
+    
+    def _store_clear(self):
+        """Delete every record from the persistent tier"""
+        for cache_file in self.cache_dir.glob("*.json"):
+            cache_file.unlink(missing_ok=True)
+
+class SQLiteCache(Cache):
+    """
+    Cache whose persistent tier is a single SQLite database in WAL mode
+    
+    Safe for concurrent use by several worker processes. Expired rows are
+    removed by a background sweeper, and once the stored values exceed
+    max_bytes the least recently used entries are evicted. The memory tier
+    is still per process, so entries changed by another worker are only
+    seen here once the local copy expires or is evicted.
+    """
+    
+    PRAGMAS = (
+        ('journal_mode', 'WAL'),
+        ('synchronous', 'NORMAL'),
+        ('temp_store', 'MEMORY'),
+    )
+    
+    # Reads refresh accessed_at at most this often (seconds), so hot keys
+    # don't turn every lookup into a write
+    ACCESS_RESOLUTION = 60
+    
+    # Writes between size-cap checks
+    EVICT_CHECK_EVERY = 100
+    
+    # Evict down to this fraction of max_bytes once the cap is exceeded
+    EVICT_TARGET = 0.9
+    
+    def __init__(
+        self,
+        db_path: str = CACHE_DB_PATH,
+        default_ttl: int = 3600,
+        max_bytes: int = CACHE_MAX_BYTES,
+        sweep_interval: int = CACHE_SWEEP_INTERVAL,
+        memory_entries: int = CACHE_MEMORY_MAX_ENTRIES,
+        memory_bytes: int = CACHE_MEMORY_MAX_BYTES,
+        serializer: Optional[CacheSerializer] = None
+    ):
+        """
+        Initialize SQLite cache
+        
+        Args:
+            db_path: Cache database file
+            default_ttl: Default time-to-live in seconds (1 hour)
+            max_bytes: Size cap for stored values before LRU eviction
+            sweep_interval: Seconds between expired-row sweeps (0 disables)
+            memory_entries: Max entries in the memory tier (0 disables it)
+            memory_bytes: Max uncompressed bytes in the memory tier
+            serializer: Entry encoding (defaults to CACHE_SERIALIZER/CACHE_COMPRESSION)
+        """
+        self.db_path = Path(db_path)
+        super().__init__(
+            cache_dir=str(self.db_path.parent),
+            default_ttl=default_ttl,
+            memory_entries=memory_entries,
+            memory_bytes=memory_bytes,
+            serializer=serializer
+        )
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._local = local()
+        self._writes_since_evict = 0
+        self._sweeper_pid = None
+        self._stop_sweeper = Event()
+        self._init_schema()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a new tuned connection to the cache database"""
+        conn = sqlite3.connect(self.db_path, timeout=30.0)
+        for pragma, value in self.PRAGMAS:
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """
+        Get the calling thread's pooled connection
+        
+        A connection inherited across a fork is discarded and reopened, and
+        the sweeper is (re)started in each process that uses the cache.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._start_sweeper()
+        return conn
+    
+    def _init_schema(self):
+        """Create the cache table if it doesn't exist"""
+        conn = self._get_connection()
+        with conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries(expires_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries(accessed_at)')
+    
+    def _start_sweeper(self):
+        """Start the expired-row sweeper for this process"""
+        if self.sweep_interval <= 0 or self._sweeper_pid == os.getpid():
+            return
+        self._sweeper_pid = os.getpid()
+        self._stop_sweeper.clear()
+        Thread(target=self._sweep_loop, name='cache-sweeper', daemon=True).start()
+    
+    def _sweep_loop(self):
+        while not self._stop_sweeper.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning(f"Cache sweep failed: {e}")
+    
+    def sweep(self) -> int:
+        """
+        Delete expired rows and enforce the size cap
+        
+        Returns:
+            Number of rows removed
+        """
+        conn = self._get_connection()
+        with conn:
+            removed = conn.execute(
+                'DELETE FROM cache_entries WHERE expires_at < ?', (time.time(),)
+            ).rowcount
+        removed += self._evict()
+        if removed:
+            logger.debug(f"Cache sweep removed {removed} entries")
+        return removed
+    
+    def _evict(self) -> int:
+        """
+        Evict least recently used rows until under EVICT_TARGET * max_bytes
+        
+        Returns:
+            Number of rows evicted
+        """
+        conn = self._get_connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            total = conn.execute('SELECT IFNULL(SUM(size), 0) FROM cache_entries').fetchone()[0]
+            if total <= self.max_bytes:
+                conn.commit()
+                return 0
+            
+            excess = total - int(self.max_bytes * self.EVICT_TARGET)
+            victims = []
+            for key, size in conn.execute('SELECT key, size FROM cache_entries ORDER BY accessed_at'):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany('DELETE FROM cache_entries WHERE key = ?', victims)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        logger.info(f"Cache evicted {len(victims)} least recently used entries")
+        return len(victims)
+    
+    def close(self):
+        """Stop the sweeper and close the calling thread's connection"""
+        self._stop_sweeper.set()
+        self._sweeper_pid = None
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            if self._local.pid == os.getpid():
+                conn.close()
+            self._local.conn = None
+    
+    def get_stats(self) -> Dict:
+        """Get cache statistics, including stored entry count and size"""
+        stats = super().get_stats()
+        entries, size = self._get_connection().execute(
+            'SELECT COUNT(*), IFNULL(SUM(size), 0) FROM cache_entries'
+        ).fetchone()
+        stats['disk'].update({'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes})
+        return stats
+    
+    # Persistent tier (rows in cache_entries)
+    
+    def _store_get(self, key: str) -> Optional[Tuple[Dict, int]]:
+        conn = self._get_connection()
+        row = conn.execute(
+            'SELECT value, created_at, expires_at, accessed_at, size FROM cache_entries WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        value, created_at, expires_at, accessed_at, size = row
+        now = time.time()
+        if now - accessed_at > self.ACCESS_RESOLUTION:
+            with conn:
+                conn.execute('UPDATE cache_entries SET accessed_at = ? WHERE key = ?', (now, key))
+        
+        value, payload_size = self.serializer.loads_sized(value)
+        record = {
+            'timestamp': created_at,
+            'expires_at': expires_at,
+            'value': value
+        }
+        return record, payload_size
+    
+    def _store_set(self, key: str, record: Dict) -> int:
+        raw, payload_size = self.serializer.dumps_sized(record['value'])
+        size = len(raw)  # stored bytes, for the disk budget
+        conn = self._get_connection()
+        with conn:
+            conn.execute('''
+                INSERT INTO cache_entries (key, value, created_at, expires_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    value = excluded.value,
+                    created_at = excluded.created_at,
+                    expires_at = excluded.expires_at,
+                    accessed_at = excluded.accessed_at,
+                    size = excluded.size
+            ''', (key, raw, record['timestamp'], record.get('expires_at'), record['timestamp'], size))
+        
+        self._writes_since_evict += 1
+        if self._writes_since_evict >= self.EVICT_CHECK_EVERY:
+            self._writes_since_evict = 0
+            self._evict()
+        
+        return payload_size
+    
+    def _store_delete(self, key: str):
+        conn = self._get_connection()
+        with conn:
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+    
+    def _store_clear(self):
+        conn = self._get_connection()
+        with conn:
+            conn.execute('DELETE FROM cache_entries')
 
 # Global cache instance
 _cache = None
@@ -128,7 +890,10 @@ def get_cache() -> Cache:
     """Get cache instance"""
     global _cache
     if _cache is None:
-        _cache = Cache()
+        if CACHE_BACKEND == 'sqlite':
+            _cache = SQLiteCache()
+        else:
+            _cache = Cache()
     return _cache
 
 def cached(key_prefix: str, ttl: int = 3600):
@@ -148,19 +913,12 @@ def cached(key_prefix: str, ttl: int = 3600):
             key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
             cache_key = ":".join(key_parts)
             
-            cache = get_cache()
-            cached_value = cache.get(cache_key, ttl=ttl)
-            
-            if cached_value is not None:
-                logger.debug(f"Cache hit: {cache_key}")
-                return cached_value
-            
-            # Call function and cache result
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl=ttl)
-            logger.debug(f"Cache miss: {cache_key}")
+            def compute():
+                logger.debug(f"Cache miss: {cache_key}")
+                return func(*args, **kwargs)
             
-            return result
+            # Concurrent callers with the same arguments share one call
+            return get_cache().get_or_compute(cache_key, compute, ttl=ttl)
         return wrapper
     return decorator
 
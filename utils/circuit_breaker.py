@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Circuit breakers for external providers
+Stop calling a failing provider for a while instead of paying its timeout
+on every request, then probe it before letting traffic through again
+"""
+
+import time
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, Tuple
+from utils.logger import get_logger
+from config import (
+    CIRCUIT_FAILURE_RATE, CIRCUIT_MIN_CALLS, CIRCUIT_WINDOW, CIRCUIT_RECOVERY_TIMEOUT
+)
+
+logger = get_logger('circuit_breaker')
+
+class CircuitOpenError(Exception):
+    """Raised when a call is refused because the provider's circuit is open"""
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker
+    
+    CLOSED: calls pass; outcomes in the last `window` seconds are tracked and
+    the circuit opens once at least `min_calls` were made with a failure rate
+    of `failure_rate` or more.
+    OPEN: calls fail fast until `recovery_timeout` has passed.
+    HALF_OPEN: one probe call is let through; success closes the circuit,
+    failure opens it for another `recovery_timeout`.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        window: float = CIRCUIT_WINDOW,
+        recovery_timeout: float = CIRCUIT_RECOVERY_TIMEOUT
+    ):
+        """
+        Initialize circuit breaker
+        
+        Args:
+            name: Provider name (for logs and stats)
+            failure_rate: Failure fraction (0-1) in the window that opens the circuit
+            min_calls: Calls needed in the window before the rate is judged
+            window: Seconds of call outcomes to consider
+            recovery_timeout: Seconds to stay open before probing
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.recovery_timeout = recovery_timeout
+        
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()  # (time, succeeded)
+        self._probing = False
+        self.lock = Lock()
+    
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may be made now
+        
+        In HALF_OPEN this admits a single probe; the caller must report its
+        outcome with record_success() or record_failure().
+        
+        Returns:
+            True if the call may proceed, False to fail fast
+        """
+        with self.lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+                logger.info(f"Circuit for {self.name} half-open, probing")
+            
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    self.rejected += 1
+                    return False
+                self._probing = True
+            
+            return True
+    
+    def record_success(self):
+        """Report a successful call"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.CLOSED
+                self._probing = False
+                self._outcomes.clear()
+                logger.info(f"Circuit for {self.name} closed")
+                return
+            self._record(True)
+    
+    def record_failure(self):
+        """Report a failed call (timeout, connection error, 5xx, 429)"""
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self._open()
+                return
+            self._record(False)
+            
+            calls = len(self._outcomes)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if self.state == self.CLOSED and calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._open()
+    
+    def get_stats(self) -> Dict:
+        """Get current circuit state"""
+        with self.lock:
+            self._trim(time.monotonic())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            return {
+                'state': self.state,
+                'calls': calls,
+                'failure_rate': round(failures / calls, 2) if calls else 0.0,
+                'rejected': self.rejected
+            }
+    
+    def _record(self, succeeded: bool):
+        """Add an outcome to the window (call under lock)"""
+        now = time.monotonic()
+        self._outcomes.append((now, succeeded))
+        self._trim(now)
+    
+    def _trim(self, now: float):
+        """Drop outcomes older than the window (call under lock)"""
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+    
+    def _open(self):
+        """Open the circuit (call under lock)"""
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self._probing = False
+        self._outcomes.clear()
+        logger.warning(f"Circuit for {self.name} opened, failing fast for {self.recovery_timeout:g}s")
+
+# Global circuit breakers per provider
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = Lock()
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """
+    Get or create the circuit breaker for a provider
+    
+    Args:
+        name: Provider name
+    
+    Returns:
+        CircuitBreaker instance
+    """
+    with _circuit_breakers_lock:
+        if name not in _circuit_breakers:
+            _circuit_breakers[name] = CircuitBreaker(name)
+        return _circuit_breakers[name]
+
+def get_circuit_breaker_stats() -> Dict[str, Dict]:
+    """Get current state of every circuit breaker"""
+    with _circuit_breakers_lock:
+        breakers = dict(_circuit_breakers)
+    return {name: breaker.get_stats() for name, breaker in breakers.items()}
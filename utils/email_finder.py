@@ -8,10 +8,20 @@ import os
 import re
 import time
 import requests
-from typing import Optional, Dict, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, List, Tuple
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from utils.logger import get_logger
+from utils.cache import get_cache
+from utils.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from config import (
+    EMAIL_PROVIDER_TIMEOUT, EMAIL_LOOKUP_TTL, EMAIL_LOOKUP_NEGATIVE_TTL,
+    EMAIL_HTTP_POOL_SIZE, EMAIL_FINDER_RACE, EMAIL_RACE_MIN_CONFIDENCE,
+    EMAIL_VERIFY_TTL, EMAIL_VERIFY_WORKERS
+)
 
 load_dotenv()
 
@@ -20,6 +30,9 @@ logger = get_logger('email_finder')
 class EmailFinder:
     """Email finding service with multiple provider support"""
     
+    # Refresh the Snov.io OAuth token this many seconds before it expires
+    SNOV_TOKEN_REFRESH_MARGIN = 60
+    
     def __init__(self):
         self.hunter_api_key = os.getenv('HUNTER_API_KEY')
         self.clearbit_api_key = os.getenv('CLEARBIT_API_KEY')
@@ -27,9 +40,20 @@ class EmailFinder:
         self.snov_client_id = os.getenv('SNOV_CLIENT_ID')
         self.snov_client_secret = os.getenv('SNOV_CLIENT_SECRET')
         
+        # Domain -> lookup result store (hits and misses)
+        self.cache = get_cache()
+        
         # Rate limiting
         self.last_request_time = {}
         self.min_request_interval = 0.5  # 500ms between requests
+        self._rate_lock = Lock()
+        
+        # Circuit breakers: skip a failing provider instead of paying its
+        # timeout for every lead
+        self.breakers = {
+            provider: get_circuit_breaker(f"email_{provider}")
+            for provider in ('hunter', 'clearbit', 'snov')
+        }
         
         # Provider priority (try in order)
         self.providers = []
@@ -42,14 +66,83 @@ class EmailFinder:
         
         if not self.providers:
             logger.warning("No email finder API keys configured. Email finding will be limited.")
+        
+        # One keep-alive session per provider, so leads reuse connections
+        # instead of paying a TCP + TLS handshake per request
+        self.sessions = {provider: self._make_session() for provider in ('hunter', 'clearbit', 'snov')}
+        
+        # Snov.io OAuth token, shared by all threads and refreshed before expiry
+        self._snov_token = None
+        self._snov_token_expires_at = 0.0
+        self._snov_token_lock = Lock()
+        
+        # Race mode: query all providers at once, take the first confident hit
+        self.race = EMAIL_FINDER_RACE and len(self.providers) > 1
+        self._race_pool = None
+        self._race_pool_lock = Lock()
+    
+    def _make_session(self) -> requests.Session:
+        """Create a pooled HTTP session for one provider"""
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=EMAIL_HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    
+    def _rate_limit(self, provider: str) -> bool:
+        """
+        Enforce rate limiting, failing fast while the provider's circuit is open
+        
+        Returns:
+            True if the call may proceed, False if the circuit refused it
+        """
+        if not self.breakers[provider].allow_request():
+            return False
+        
+        # Reserve the next slot under the lock so concurrent workers queue
+        # up instead of all seeing the same last request time
+        with self._rate_lock:
+            now = time.time()
+            slot = max(now, self.last_request_time.get(provider, 0.0) + self.min_request_interval)
+            self.last_request_time[provider] = slot
+        if slot > now:
+            time.sleep(slot - now)
+        return True
     
-    def _rate_limit(self, provider: str):
-        """Enforce rate limiting"""
-        if provider in self.last_request_time:
-            elapsed = time.time() - self.last_request_time[provider]
-            if elapsed < self.min_request_interval:
-                time.sleep(self.min_request_interval - elapsed)
-        self.last_request_time[provider] = time.time()
+    def _request(self, provider: str, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Call a provider through its circuit breaker and rate limit
+        
+        Timeouts, connection errors, 5xx and 429 responses count as
+        failures; any other response means the provider is up.
+        
+        Args:
+            provider: Provider name
+            method: HTTP method
+            url: Request URL
+            **kwargs: Passed to Session.request
+        
+        Returns:
+            The response (status not checked)
+        
+        Raises:
+            CircuitOpenError: If the provider's circuit is open
+        """
+        if not self._rate_limit(provider):
+            raise CircuitOpenError(f"{provider} circuit open")
+        
+        breaker = self.breakers[provider]
+        try:
+            response = self.sessions[provider].request(method, url, timeout=EMAIL_PROVIDER_TIMEOUT, **kwargs)
+        except Exception:
+            breaker.record_failure()
+            raise
+        
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
     
     def find_email_hunter(self, domain: str, first_name: Optional[str] = None, last_name: Optional[str] = None) -> Optional[Dict]:
         """Find email using Hunter.io"""
@@ -57,33 +150,9 @@ class EmailFinder:
             return None
         
         try:
-            self._rate_limit('hunter')
-            
-            url = "https://api.hunter.io/v2/domain-search"
-            params = {
-                'domain': domain,
-                'api_key': self.hunter_api_key,
-                'limit': 10
-            }
-            
-            if first_name and last_name:
-                params['first_name'] = first_name
-                params['last_name'] = last_name
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get('data') and data['data'].get('emails'):
-                emails = data['data']['emails']
-                # Return the most likely email (usually first one)
-                best_email = emails[0]
-                return {
-                    'email': best_email.get('value'),
-                    'confidence': best_email.get('confidence_score', 0),
-                    'sources': best_email.get('sources', []),
-                    'provider': 'hunter'
-                }
+            return self._search_hunter(domain, first_name, last_name)
+        except CircuitOpenError:
+            pass
         except Exception as e:
             logger.error(f"Hunter.io email finder error: {e}")
         
@@ -95,25 +164,9 @@ class EmailFinder:
             return None
         
         try:
-            self._rate_limit('clearbit')
-            
-            # Clearbit Enrichment API
-            url = f"https://company.clearbit.com/v2/companies/find"
-            headers = {'Authorization': f'Bearer {self.clearbit_api_key}'}
-            params = {'domain': domain}
-            
-            response = requests.get(url, headers=headers, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Clearbit doesn't directly provide emails, but we can construct common patterns
-                if data.get('domain'):
-                    return {
-                        'email': f"info@{data['domain']}",
-                        'confidence': 50,
-                        'provider': 'clearbit',
-                        'pattern': 'generic'
-                    }
+            return self._search_clearbit(domain)
+        except CircuitOpenError:
+            pass
         except Exception as e:
             logger.debug(f"Clearbit email finder error: {e}")
         
@@ -125,47 +178,284 @@ class EmailFinder:
             return None
         
         try:
-            self._rate_limit('snov')
-            
-            # Snov.io requires OAuth token first
-            if not hasattr(self, '_snov_token'):
-                token_url = "https://api.snov.io/v1/oauth/access_token"
-                token_params = {
-                    'grant_type': 'client_credentials',
-                    'client_id': self.snov_client_id,
-                    'client_secret': self.snov_client_secret
-                }
-                token_response = requests.post(token_url, data=token_params, timeout=10)
-                if token_response.status_code == 200:
-                    self._snov_token = token_response.json().get('access_token')
-                else:
-                    return None
-            
-            # Find emails
-            url = "https://api.snov.io/v1/get-domain-emails-with-info"
-            params = {
-                'access_token': self._snov_token,
-                'domain': domain,
-                'limit': 10
+            return self._search_snov(domain, first_name, last_name)
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.debug(f"Snov.io email finder error: {e}")
+        
+        return None
+    
+    def _search_hunter(self, domain: str, first_name: Optional[str] = None, last_name: Optional[str] = None) -> Optional[Dict]:
+        """Query Hunter.io domain search (raises on request errors)"""
+        url = "https://api.hunter.io/v2/domain-search"
+        params = {
+            'domain': domain,
+            'api_key': self.hunter_api_key,
+            'limit': 10
+        }
+        
+        if first_name and last_name:
+            params['first_name'] = first_name
+            params['last_name'] = last_name
+        
+        response = self._request('hunter', 'GET', url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        if data.get('data') and data['data'].get('emails'):
+            emails = data['data']['emails']
+            # Return the most likely email (usually first one)
+            best_email = emails[0]
+            return {
+                'email': best_email.get('value'),
+                'confidence': best_email.get('confidence_score', 0),
+                'sources': best_email.get('sources', []),
+                'provider': 'hunter'
             }
-            
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
+        return None
+    
+    def _search_clearbit(self, domain: str, first_name: Optional[str] = None, last_name: Optional[str] = None) -> Optional[Dict]:
+        """Query Clearbit company lookup (raises on request errors)"""
+        # Clearbit Enrichment API
+        url = f"https://company.clearbit.com/v2/companies/find"
+        headers = {'Authorization': f'Bearer {self.clearbit_api_key}'}
+        params = {'domain': domain}
+        
+        response = self._request('clearbit', 'GET', url, headers=headers, params=params)
+        
+        if response.status_code == 200:
             data = response.json()
-            
-            if data.get('result') and data['result'].get('emails'):
-                emails = data['result']['emails']
-                best_email = emails[0]
+            # Clearbit doesn't directly provide emails, but we can construct common patterns
+            if data.get('domain'):
                 return {
-                    'email': best_email.get('email'),
-                    'confidence': best_email.get('verification', {}).get('status') == 'valid' and 90 or 50,
-                    'provider': 'snov'
+                    'email': f"info@{data['domain']}",
+                    'confidence': 50,
+                    'provider': 'clearbit',
+                    'pattern': 'generic'
                 }
-        except Exception as e:
-            logger.debug(f"Snov.io email finder error: {e}")
+        elif response.status_code != 404:
+            # 404 is Clearbit's answer for an unknown company; anything else is an error
+            response.raise_for_status()
+        return None
+    
+    def _search_snov(self, domain: str, first_name: Optional[str] = None, last_name: Optional[str] = None) -> Optional[Dict]:
+        """Query Snov.io domain emails (raises on request errors)"""
+        url = "https://api.snov.io/v1/get-domain-emails-with-info"
+        params = {
+            'access_token': self._get_snov_token(),
+            'domain': domain,
+            'limit': 10
+        }
+        
+        response = self._request('snov', 'GET', url, params=params)
+        if response.status_code == 401:
+            # Token revoked or expired early: fetch a new one and retry once
+            params['access_token'] = self._get_snov_token(force_refresh=True)
+            response = self._request('snov', 'GET', url, params=params)
+        response.raise_for_status()
+        data = response.json()
         
+        if data.get('result') and data['result'].get('emails'):
+            emails = data['result']['emails']
+            best_email = emails[0]
+            return {
+                'email': best_email.get('email'),
+                'confidence': best_email.get('verification', {}).get('status') == 'valid' and 90 or 50,
+                'provider': 'snov'
+            }
         return None
     
+    def _get_snov_token(self, force_refresh: bool = False) -> str:
+        """
+        Get the Snov.io OAuth token, fetching a new one shortly before expiry
+        
+        Args:
+            force_refresh: Fetch a new token even if the current one looks valid
+        
+        Returns:
+            Access token
+        """
+        with self._snov_token_lock:
+            if (
+                not force_refresh and self._snov_token and
+                time.time() < self._snov_token_expires_at - self.SNOV_TOKEN_REFRESH_MARGIN
+            ):
+                return self._snov_token
+            
+            token_url = "https://api.snov.io/v1/oauth/access_token"
+            token_params = {
+                'grant_type': 'client_credentials',
+                'client_id': self.snov_client_id,
+                'client_secret': self.snov_client_secret
+            }
+            token_response = self._request('snov', 'POST', token_url, data=token_params)
+            token_response.raise_for_status()
+            data = token_response.json()
+            
+            self._snov_token = data.get('access_token')
+            self._snov_token_expires_at = time.time() + float(data.get('expires_in') or 3600)
+            return self._snov_token
+    
+    def _clean_domain(self, domain: str) -> str:
+        """Strip scheme, path and query from a website or domain"""
+        domain = domain.replace('http://', '').replace('https://', '').split('/')[0]
+        return domain.split('?')[0].lower()
+    
+    def _query_providers(
+        self,
+        domain: str,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ) -> Tuple[Optional[Dict], bool]:
+        """
+        Ask each configured provider in order until one finds an email
+        
+        Returns:
+            (result or None, whether every provider gave a real answer);
+            a miss is only conclusive if no provider errored or was skipped
+        """
+        if self.race:
+            return self._race_providers(domain, first_name, last_name)
+        
+        conclusive = True
+        
+        for provider in self.providers:
+            try:
+                result = self._searches[provider](domain, first_name, last_name)
+            except CircuitOpenError:
+                conclusive = False
+                continue
+            except Exception as e:
+                logger.warning(f"Email finder {provider} failed: {e}")
+                conclusive = False
+                continue
+            
+            if result and result.get('email'):
+                logger.info(f"Found email via {result['provider']}: {result['email']} (confidence: {result.get('confidence', 0)})")
+                return result, True
+        
+        return None, conclusive
+    
+    @property
+    def _searches(self) -> Dict:
+        """Provider name -> raising search method"""
+        return {
+            'hunter': self._search_hunter,
+            'clearbit': self._search_clearbit,
+            'snov': self._search_snov
+        }
+    
+    def _race_providers(
+        self,
+        domain: str,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None
+    ) -> Tuple[Optional[Dict], bool]:
+        """
+        Ask every configured provider at once
+        
+        Returns as soon as a result reaches EMAIL_RACE_MIN_CONFIDENCE; if
+        none does, the most confident result once all providers answered.
+        Slower providers finish in the background.
+        
+        Returns:
+            (result or None, whether every provider gave a real answer)
+        """
+        with self._race_pool_lock:
+            if self._race_pool is None:
+                self._race_pool = ThreadPoolExecutor(
+                    max_workers=len(self.providers) * EMAIL_HTTP_POOL_SIZE,
+                    thread_name_prefix='email-race'
+                )
+        
+        futures = {
+            self._race_pool.submit(self._searches[provider], domain, first_name, last_name): provider
+            for provider in self.providers
+        }
+        results = {}
+        conclusive = True
+        
+        for future in as_completed(futures):
+            provider = futures[future]
+            try:
+                result = future.result()
+            except CircuitOpenError:
+                conclusive = False
+                continue
+            except Exception as e:
+                logger.warning(f"Email finder {provider} failed: {e}")
+                conclusive = False
+                continue
+            
+            if not result or not result.get('email'):
+                continue
+            if result.get('confidence', 0) >= EMAIL_RACE_MIN_CONFIDENCE:
+                logger.info(f"Found email via {provider} (race): {result['email']} (confidence: {result.get('confidence', 0)})")
+                return result, True
+            results[provider] = result
+        
+        if not results:
+            return None, conclusive
+        
+        # Nobody was confident: prefer higher confidence, then provider order
+        best = max(
+            results.values(),
+            key=lambda r: (r.get('confidence', 0), -self.providers.index(r['provider']))
+        )
+        logger.info(f"Found email via {best['provider']}: {best['email']} (confidence: {best.get('confidence', 0)})")
+        return best, True
+    
+    def lookup_email(
+        self,
+        domain: str,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        refresh: bool = False
+    ) -> Optional[Dict]:
+        """
+        Find the email for a domain, remembering hits and misses per domain
+        
+        Leads sharing a domain (chains, franchises, subsidiaries) and reruns
+        reuse the stored result. Hits are kept for EMAIL_LOOKUP_TTL, misses
+        for EMAIL_LOOKUP_NEGATIVE_TTL; a miss caused by a provider error or
+        open circuit is not remembered.
+        
+        Args:
+            domain: Company domain or website URL
+            first_name: Optional first name
+            last_name: Optional last name
+            refresh: Ignore any stored result and ask the providers again
+        
+        Returns:
+            Dict with email, provider, confidence and looked_up_at, or None
+        """
+        domain = self._clean_domain(domain or '')
+        if not domain or not self.providers:
+            return None
+        
+        cache_key = f"email_lookup:{domain}"
+        if refresh:
+            self.cache.delete(cache_key)
+        
+        def lookup() -> Optional[Dict]:
+            result, conclusive = self._query_providers(domain, first_name, last_name)
+            if result is not None:
+                return {**result, 'looked_up_at': time.time()}
+            if conclusive:
+                # Negative entry: written here because it has its own shorter TTL
+                self.cache.set(cache_key, {
+                    'email': None,
+                    'provider': None,
+                    'confidence': 0,
+                    'looked_up_at': time.time()
+                }, ttl=EMAIL_LOOKUP_NEGATIVE_TTL)
+            return None
+        
+        # Leads of the same domain enriched concurrently share one lookup
+        record = self.cache.get_or_compute(cache_key, lookup, ttl=EMAIL_LOOKUP_TTL)
+        return record if record and record.get('email') else None
+    
     def find_email(self, domain: str, first_name: Optional[str] = None, last_name: Optional[str] = None) -> Optional[str]:
         """
         Find email address for a domain using available providers
@@ -181,30 +471,12 @@ class EmailFinder:
         if not domain:
             return None
         
-        # Clean domain
-        domain = domain.replace('http://', '').replace('https://', '').split('/')[0]
-        domain = domain.split('?')[0]
-        
-        # Try each provider in order
-        for provider in self.providers:
-            try:
-                if provider == 'hunter':
-                    result = self.find_email_hunter(domain, first_name, last_name)
-                elif provider == 'clearbit':
-                    result = self.find_email_clearbit(domain)
-                elif provider == 'snov':
-                    result = self.find_email_snov(domain, first_name, last_name)
-                else:
-                    continue
-                
-                if result and result.get('email'):
-                    logger.info(f"Found email via {result['provider']}: {result['email']} (confidence: {result.get('confidence', 0)})")
-                    return result['email']
-            except Exception as e:
-                logger.warning(f"Email finder {provider} failed: {e}")
-                continue
+        result = self.lookup_email(domain, first_name, last_name)
+        if result:
+            return result['email']
         
         # Fallback: Generate common email patterns
+        domain = self._clean_domain(domain)
         logger.debug(f"No email found via APIs, generating pattern for {domain}")
         return self._generate_email_pattern(domain)
     
@@ -219,45 +491,34 @@ class EmailFinder:
         ]
         return patterns[0]  # Return most common pattern
     
+    # Basic address format check
+    EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+    
     def verify_email(self, email: str) -> Dict:
         """
         Verify email address validity
         
+        Provider results are cached per address for EMAIL_VERIFY_TTL.
+        
         Args:
             email: Email address to verify
         
         Returns:
             Dict with verification results
         """
-        if not email or '@' not in email:
-            return {'valid': False, 'reason': 'invalid_format'}
-        
-        # Basic format validation
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        if not re.match(pattern, email):
+        if not email or not self.EMAIL_PATTERN.match(email.strip()):
             return {'valid': False, 'reason': 'invalid_format'}
         
         # If Hunter.io is available, use their verification
         if self.hunter_api_key:
             try:
-                self._rate_limit('hunter')
-                url = "https://api.hunter.io/v2/email-verifier"
-                params = {
-                    'email': email,
-                    'api_key': self.hunter_api_key
-                }
-                
-                response = requests.get(url, params=params, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                result = data.get('data', {})
-                return {
-                    'valid': result.get('result') == 'deliverable',
-                    'reason': result.get('result'),
-                    'score': result.get('score', 0),
-                    'provider': 'hunter'
-                }
+                return self.cache.get_or_compute(
+                    f"email_verify:{email.strip().lower()}",
+                    lambda: self._verify_hunter(email.strip()),
+                    ttl=EMAIL_VERIFY_TTL
+                )
+            except CircuitOpenError:
+                pass
             except Exception as e:
                 logger.debug(f"Email verification error: {e}")
         
@@ -268,6 +529,71 @@ class EmailFinder:
             'score': 50,
             'provider': 'basic'
         }
+    
+    def _verify_hunter(self, email: str) -> Dict:
+        """Query Hunter.io email verifier (raises on request errors)"""
+        url = "https://api.hunter.io/v2/email-verifier"
+        params = {
+            'email': email,
+            'api_key': self.hunter_api_key
+        }
+        
+        response = self._request('hunter', 'GET', url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        
+        result = data.get('data', {})
+        return {
+            'valid': result.get('result') == 'deliverable',
+            'reason': result.get('result'),
+            'score': result.get('score', 0),
+            'provider': 'hunter'
+        }
+    
+    def verify_emails(
+        self,
+        emails: List[str],
+        max_calls: Optional[int] = None,
+        max_workers: int = EMAIL_VERIFY_WORKERS
+    ) -> Dict[str, Dict]:
+        """
+        Verify many addresses with a worker pool
+        
+        Addresses are deduplicated case-insensitively and cached results are
+        reused without spending a request. The pool still goes through the
+        per-provider rate limit and circuit breaker.
+        
+        Args:
+            emails: Addresses to verify (duplicates and blanks allowed)
+            max_calls: Most provider requests to spend; addresses beyond the
+                budget are left out of the result
+            max_workers: Concurrent verification requests
+        
+        Returns:
+            Lowercased address -> verify_email result
+        """
+        results = {}
+        pending = []
+        for email in dict.fromkeys(e.strip().lower() for e in emails if e and e.strip()):
+            if not self.EMAIL_PATTERN.match(email):
+                results[email] = {'valid': False, 'reason': 'invalid_format'}
+                continue
+            cached = self.cache.get(f"email_verify:{email}", ttl=EMAIL_VERIFY_TTL) if self.hunter_api_key else None
+            if cached is not None:
+                results[email] = cached
+            else:
+                pending.append(email)
+        
+        if self.hunter_api_key and max_calls is not None and len(pending) > max_calls:
+            logger.info(f"Verification budget {max_calls} reached, deferring {len(pending) - max_calls} addresses")
+            pending = pending[:max_calls]
+        
+        if pending:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='email-verify') as pool:
+                for email, result in zip(pending, pool.map(self.verify_email, pending)):
+                    results[email] = result
+        
+        return results
 
 # Global instance
 _email_finder = None
@@ -7,6 +7,8 @@ import time
 from typing import Dict, Any
 from pathlib import Path
 from utils.logger import get_logger
+from utils.rate_limiter import get_rate_limit_stats
+from utils.circuit_breaker import get_circuit_breaker_stats
 from database import Database
 from config import DATABASE_PATH
 
@@ -32,7 +34,9 @@ class SystemMonitor:
             'memory': self.get_memory_usage(),
             'disk': self.get_disk_usage(),
             'database': self.get_database_health(),
-            'logs': self.get_log_stats()
+            'logs': self.get_log_stats(),
+            'rate_limits': get_rate_limit_stats(),
+            'circuit_breakers': get_circuit_breaker_stats()
         }
     
     def get_cpu_usage(self) -> Dict[str, float]:
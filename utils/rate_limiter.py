@@ -4,16 +4,44 @@ Rate limiting utilities for API calls
 Prevents hitting API rate limits and ensures fair usage
 """
 
+import os
 import time
-from collections import defaultdict
-from typing import Dict, Optional
-from threading import Lock
+import asyncio
+import sqlite3
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from threading import Lock, local
 from utils.logger import get_logger
+from config import RATE_LIMIT_BACKEND, RATE_LIMIT_DB_PATH, RATE_LIMIT_ADAPT_TTL
 
 logger = get_logger('rate_limiter')
 
 class RateLimiter:
-    """Thread-safe rate limiter"""
+    """
+    Thread-safe token-bucket rate limiter
+    
+    Each key has a bucket holding up to max_calls tokens, refilled at
+    max_calls/period tokens per second. Callers reserve a token under the
+    lock (O(1)) and sleep for their turn outside it, so waiting on one key
+    never blocks callers of another, and queued callers are served in order.
+    
+    The rate adapts to provider feedback (AIMD): record_throttle() halves
+    it and pauses callers on a 429, record_success() raises it again step
+    by step after a full window of clean calls, up to the ceiling. Quota
+    headers (observe_headers) can lower the ceiling below the configured
+    rate, never raise it. Adapted limits fall back to the configured ones
+    after RATE_LIMIT_ADAPT_TTL seconds without a further change.
+    """
+    
+    # Multiplicative decrease on throttling
+    DECREASE_FACTOR = 0.5
+    
+    # Additive increase per clean window, as a fraction of the ceiling
+    INCREASE_FRACTION = 0.1
+    
+    # Never adapt below this fraction of the ceiling
+    MIN_FRACTION = 0.1
     
     def __init__(self, max_calls: int, period: float):
         """
@@ -25,9 +53,115 @@ class RateLimiter:
         """
         self.max_calls = max_calls
         self.period = period
-        self.calls = defaultdict(list)
+        self.ceiling = max_calls
+        self.configured = (max_calls, period)
+        self.throttles = 0
+        self._successes = 0
+        self._adapted_at: Optional[float] = None  # time.time() of the last adaptation
+        self.buckets: Dict[str, List[float]] = {}  # key -> [tokens, updated_at]
         self.lock = Lock()
     
+    @property
+    def rate(self) -> float:
+        """Refill rate in calls per second"""
+        return self.max_calls / self.period
+    
+    def _refill(self, key: str, now: float) -> List[float]:
+        """Get the key's bucket with tokens topped up to now (call under lock)"""
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [float(self.max_calls), now]
+        else:
+            bucket[0] = self._topped_up(bucket[0], bucket[1], now)
+            bucket[1] = now
+        return bucket
+    
+    def _topped_up(self, tokens: float, updated_at: float, now: float) -> float:
+        """Tokens in a bucket last updated at updated_at, refilled to now"""
+        return min(float(self.max_calls), tokens + max(0.0, now - updated_at) * self.rate)
+    
+    def _take(self, tokens: float, timeout: Optional[float]) -> Tuple[float, Optional[float]]:
+        """
+        Reserve one token from a refilled bucket
+        
+        Returns:
+            (remaining tokens, seconds to wait), with wait None and tokens
+            unchanged if the wait would exceed timeout
+        """
+        wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+        if timeout is not None and wait > timeout:
+            return tokens, None
+        # Tokens may go negative: later callers queue behind this one
+        return tokens - 1, wait
+    
+    def _reserve(self, key: str, timeout: Optional[float]) -> Optional[float]:
+        """
+        Reserve the key's next token
+        
+        Args:
+            key: Rate limit key
+            timeout: Longest acceptable wait (None = unbounded)
+        
+        Returns:
+            Seconds to wait before using the token, or None if that would
+            exceed timeout (nothing is reserved then)
+        """
+        with self.lock:
+            self._expire_adaptation()
+            bucket = self._refill(key, time.monotonic())
+            bucket[0], wait = self._take(bucket[0], timeout)
+            return wait
+    
+    def acquire(self, key: str = 'default', timeout: Optional[float] = None) -> bool:
+        """
+        Block until a call is allowed
+        
+        Args:
+            key: Rate limit key (for different limits per service)
+            timeout: Maximum seconds to wait (None = wait as long as needed)
+        
+        Returns:
+            True if acquired, False if it would take longer than timeout
+        """
+        wait = self._reserve(key, timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            logger.debug(f"Rate limit reached for {key}, waiting {wait:.2f}s")
+            time.sleep(wait)
+        return True
+    
+    async def acquire_async(self, key: str = 'default', timeout: Optional[float] = None) -> bool:
+        """
+        Awaitable acquire() that yields to the event loop while waiting
+        
+        Args:
+            key: Rate limit key
+            timeout: Maximum seconds to wait (None = wait as long as needed)
+        
+        Returns:
+            True if acquired, False if it would take longer than timeout
+        """
+        wait = self._reserve(key, timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            logger.debug(f"Rate limit reached for {key}, waiting {wait:.2f}s")
+            await asyncio.sleep(wait)
+        return True
+    
+    def try_acquire(self, key: str = 'default') -> bool:
+        """
+        Take a call slot only if one is available right now
+        
+        Args:
+            key: Rate limit key
+        
+        Returns:
+            True if acquired, False if the caller would have to wait
+        """
+        return self._reserve(key, 0) is not None
+    
     def wait_if_needed(self, key: str = 'default'):
         """
         Wait if rate limit would be exceeded
@@ -35,29 +169,7 @@ class RateLimiter:
         Args:
             key: Rate limit key (for different limits per service)
         """
-        with self.lock:
-            now = time.time()
-            # Remove old calls outside the period
-            self.calls[key] = [
-                call_time for call_time in self.calls[key]
-                if now - call_time < self.period
-            ]
-            
-            # If at limit, wait
-            if len(self.calls[key]) >= self.max_calls:
-                sleep_time = self.period - (now - self.calls[key][0])
-                if sleep_time > 0:
-                    logger.debug(f"Rate limit reached for {key}, waiting {sleep_time:.2f}s")
-                    time.sleep(sleep_time)
-                    # Clean up again after sleep
-                    now = time.time()
-                    self.calls[key] = [
-                        call_time for call_time in self.calls[key]
-                        if now - call_time < self.period
-                    ]
-            
-            # Record this call
-            self.calls[key].append(time.time())
+        self.acquire(key)
     
     def can_proceed(self, key: str = 'default') -> bool:
         """
@@ -70,20 +182,362 @@ class RateLimiter:
             True if can proceed, False if would exceed limit
         """
         with self.lock:
-            now = time.time()
-            self.calls[key] = [
-                call_time for call_time in self.calls[key]
-                if now - call_time < self.period
-            ]
-            return len(self.calls[key]) < self.max_calls
+            return self._refill(key, time.monotonic())[0] >= 1
+    
+    def record_throttle(self, key: str = 'default', retry_after: Optional[float] = None):
+        """
+        React to a rate-limit response (HTTP 429 / ResourceExhausted)
+        
+        Args:
+            key: Rate limit key that was throttled
+            retry_after: Seconds the provider asked us to wait, if given
+        """
+        with self.lock:
+            self.throttles += 1
+            self._successes = 0
+            reduced = max(self.ceiling * self.MIN_FRACTION, self.max_calls * self.DECREASE_FACTOR)
+            self._set_limits(reduced, self.period)
+            
+            # Empty the bucket; with retry_after, push the next token past it
+            cap = -retry_after * self.rate if retry_after else 0.0
+            self._drain(key, cap)
+        
+        logger.warning(
+            f"Rate limited on {key}: now {self.max_calls:.1f} calls/{self.period:g}s"
+            + (f", pausing {retry_after:.1f}s" if retry_after else "")
+        )
+    
+    def record_success(self, key: str = 'default'):
+        """
+        Count a successful call; a full window of them raises the rate
+        
+        Args:
+            key: Rate limit key
+        """
+        with self.lock:
+            if self.max_calls >= self.ceiling:
+                return
+            self._successes += 1
+            if self._successes < self.max_calls:
+                return
+            self._successes = 0
+            raised = min(self.ceiling, self.max_calls + max(1.0, self.ceiling * self.INCREASE_FRACTION))
+            self._set_limits(raised, self.period)
+        
+        logger.info(f"Rate limit for {key} recovering: {self.max_calls:.1f} calls/{self.period:g}s")
+    
+    def observe_headers(self, headers: Optional[Mapping[str, Any]], key: str = 'default'):
+        """
+        Adopt the provider's advertised quota from response headers
+        
+        Understands X-HubSpot-RateLimit-Max / -Interval-Milliseconds /
+        -Remaining and Retry-After.
+        
+        Args:
+            headers: Response (or error) headers
+            key: Rate limit key
+        """
+        if not headers:
+            return
+        headers = {str(name).lower(): value for name, value in dict(headers).items()}
+        
+        limit = _header_number(headers, 'x-hubspot-ratelimit-max')
+        interval_ms = _header_number(headers, 'x-hubspot-ratelimit-interval-milliseconds')
+        if limit and interval_ms:
+            period = interval_ms / 1000
+            configured_calls, configured_period = self.configured
+            with self.lock:
+                # The configured rate stays the upper bound; headers can only tighten it
+                tighter = limit / period < configured_calls / configured_period
+                if tighter and (limit, period) != (self.ceiling, self.period):
+                    # Keep the same fraction of the (new) ceiling we were at
+                    fraction = self.max_calls / self.ceiling
+                    self.ceiling = limit
+                    self._set_limits(max(limit * self.MIN_FRACTION, limit * fraction), period)
+                    logger.info(f"Rate limit for {key} set from headers: {limit:g} calls/{period:g}s")
+        
+        remaining = _header_number(headers, 'x-hubspot-ratelimit-remaining')
+        retry_after = parse_retry_after(headers)
+        if retry_after:
+            with self.lock:
+                self._drain(key, -retry_after * self.rate)
+        elif remaining is not None and remaining <= 0:
+            with self.lock:
+                self._drain(key, 0.0)
+    
+    def get_stats(self) -> Dict:
+        """Get current effective limits"""
+        return {
+            'max_calls': round(self.max_calls, 2),
+            'ceiling': self.ceiling,
+            'period': self.period,
+            'calls_per_minute': round(self.rate * 60, 2),
+            'throttles': self.throttles
+        }
+    
+    def _set_limits(self, max_calls: float, period: float):
+        """Change the effective rate (call under lock)"""
+        self.max_calls = max_calls
+        self.period = period
+        self._adapted_at = time.time()
+    
+    def _restore_configured(self):
+        """Go back to the configured rate and ceiling (call under lock)"""
+        self.max_calls, self.period = self.configured
+        self.ceiling = self.max_calls
+        self._successes = 0
+        self._adapted_at = None
+    
+    def _expire_adaptation(self):
+        """Drop adapted limits older than RATE_LIMIT_ADAPT_TTL (call under lock)"""
+        if self._adapted_at is not None and time.time() - self._adapted_at > RATE_LIMIT_ADAPT_TTL:
+            self._restore_configured()
+            logger.info(f"Adapted rate limit expired, back to {self.max_calls:g} calls/{self.period:g}s")
+    
+    def _drain(self, key: str, cap: float):
+        """Lower the key's tokens to at most cap (call under lock)"""
+        bucket = self._refill(key, time.monotonic())
+        bucket[0] = min(bucket[0], cap)
+
+class SharedRateLimiter(RateLimiter):
+    """
+    Token-bucket limiter whose buckets live in a SQLite file
+    
+    All processes using the same database (e.g. gunicorn workers) draw from
+    one budget per service. Each reservation is a short BEGIN IMMEDIATE
+    transaction. If the database can't be used, the limiter falls back to
+    this process's in-memory buckets until it becomes usable again.
+    """
+    
+    def __init__(self, service: str, max_calls: int, period: float, db_path: str = RATE_LIMIT_DB_PATH):
+        """
+        Initialize shared rate limiter
+        
+        Args:
+            service: Service name (namespaces this limiter's buckets)
+            max_calls: Maximum number of calls allowed
+            period: Time period in seconds
+            db_path: Shared bucket database
+        """
+        super().__init__(max_calls, period)
+        self.service = service
+        self.db_path = Path(db_path)
+        self._local = local()
+        self._degraded = False
+        self._reseed()
+    
+    def _reseed(self):
+        """Drop a stored adapted rate that was based on a different configuration"""
+        try:
+            with self._get_connection() as conn:
+                conn.execute(
+                    'DELETE FROM rate_limits WHERE service = ? AND '
+                    '(configured_max_calls IS NOT ? OR configured_period IS NOT ?)',
+                    (self.service, *map(float, self.configured))
+                )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not reset stored rate for {self.service}: {e}")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the bucket database, creating it if needed"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                service TEXT PRIMARY KEY,
+                max_calls REAL NOT NULL,
+                period REAL NOT NULL,
+                ceiling REAL NOT NULL,
+                configured_max_calls REAL,
+                configured_period REAL,
+                updated_at REAL
+            )
+        ''')
+        
+        # Tables created before adapted limits expired lack these columns
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(rate_limits)')}
+        for column in ('configured_max_calls', 'configured_period', 'updated_at'):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE rate_limits ADD COLUMN {column} REAL')
+        return conn
+    
+    def _get_connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection (reopened after a fork)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        
+        conn = self._connect()
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+    
+    def _reserve(self, key: str, timeout: Optional[float]) -> Optional[float]:
+        try:
+            wait = self._reserve_shared(f"{self.service}:{key}", timeout)
+        except (sqlite3.Error, OSError) as e:
+            if not self._degraded:
+                logger.warning(f"Shared rate limiter unavailable for {self.service}, limiting locally: {e}")
+                self._degraded = True
+            self._local.conn = None
+            return super()._reserve(key, timeout)
+        
+        if self._degraded:
+            logger.info(f"Shared rate limiter restored for {self.service}")
+            self._degraded = False
+        return wait
+    
+    def _reserve_shared(self, bucket_key: str, timeout: Optional[float]) -> Optional[float]:
+        """Reserve a token from the shared bucket in one write transaction"""
+        conn = self._get_connection()
+        # Held like the local limiter's reserve, so loading the shared limits
+        # can't interleave with record_throttle/observe_headers in this process
+        with self.lock:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._load_limits(conn)
+                tokens, wait = self._take(self._load_tokens(conn, bucket_key), timeout)
+                self._store_tokens(conn, bucket_key, tokens)
+                conn.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+        return wait
+    
+    def _load_limits(self, conn: sqlite3.Connection):
+        """
+        Adopt the rate another process may have adapted (call under lock)
+        
+        Rows from another configuration or older than RATE_LIMIT_ADAPT_TTL
+        are ignored, and the configured rate applies.
+        """
+        row = conn.execute(
+            'SELECT max_calls, period, ceiling, configured_max_calls, configured_period, updated_at '
+            'FROM rate_limits WHERE service = ?', (self.service,)
+        ).fetchone()
+        
+        usable = (
+            row is not None and
+            row[3:5] == tuple(map(float, self.configured)) and
+            row[5] is not None and time.time() - row[5] <= RATE_LIMIT_ADAPT_TTL
+        )
+        if usable:
+            self.max_calls, self.period, self.ceiling = row[:3]
+            self._adapted_at = row[5]
+        elif self._adapted_at is not None:
+            self._restore_configured()
+    
+    def _load_tokens(self, conn: sqlite3.Connection, bucket_key: str) -> float:
+        """Tokens in a shared bucket, refilled to now"""
+        row = conn.execute(
+            'SELECT tokens, updated_at FROM rate_buckets WHERE key = ?', (bucket_key,)
+        ).fetchone()
+        return self._topped_up(*row, time.time()) if row else float(self.max_calls)
+    
+    def _store_tokens(self, conn: sqlite3.Connection, bucket_key: str, tokens: float):
+        """Write a shared bucket's tokens as of now"""
+        conn.execute(
+            'INSERT INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at',
+            (bucket_key, tokens, time.time())
+        )
+    
+    def _set_limits(self, max_calls: float, period: float):
+        """Change the effective rate for every process sharing the database"""
+        super()._set_limits(max_calls, period)
+        try:
+            with self._get_connection() as conn:
+                conn.execute(
+                    'INSERT INTO rate_limits (service, max_calls, period, ceiling, '
+                    'configured_max_calls, configured_period, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT(service) DO UPDATE SET max_calls = excluded.max_calls, '
+                    'period = excluded.period, ceiling = excluded.ceiling, '
+                    'configured_max_calls = excluded.configured_max_calls, '
+                    'configured_period = excluded.configured_period, updated_at = excluded.updated_at',
+                    (self.service, max_calls, period, self.ceiling, *map(float, self.configured), self._adapted_at)
+                )
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not share adapted rate for {self.service}: {e}")
+    
+    def _drain(self, key: str, cap: float):
+        """Lower the shared bucket's tokens to at most cap"""
+        super()._drain(key, cap)
+        bucket_key = f"{self.service}:{key}"
+        try:
+            conn = self._get_connection()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                tokens = min(self._load_tokens(conn, bucket_key), cap)
+                self._store_tokens(conn, bucket_key, tokens)
+                conn.execute('COMMIT')
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                raise
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Could not pause shared bucket {bucket_key}: {e}")
+    
+    def can_proceed(self, key: str = 'default') -> bool:
+        try:
+            row = self._get_connection().execute(
+                'SELECT tokens, updated_at FROM rate_buckets WHERE key = ?', (f"{self.service}:{key}",)
+            ).fetchone()
+        except (sqlite3.Error, OSError):
+            return super().can_proceed(key)
+        return row is None or self._topped_up(*row, time.time()) >= 1
+
+def _header_number(headers: Dict[str, Any], name: str) -> Optional[float]:
+    """Numeric header value, or None if missing or malformed"""
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def parse_retry_after(headers: Optional[Mapping[str, Any]]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date)
+    
+    Args:
+        headers: Response headers (any case)
+    
+    Returns:
+        Seconds to wait, or None if the header is absent or unparseable
+    """
+    if not headers:
+        return None
+    value = {str(name).lower(): v for name, v in dict(headers).items()}.get('retry-after')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
 
 # Global rate limiters for different services
 _rate_limiters: Dict[str, RateLimiter] = {}
+_rate_limiters_lock = Lock()
 
 def get_rate_limiter(service: str, max_calls: int = 60, period: float = 60.0) -> RateLimiter:
     """
     Get or create rate limiter for a service
     
+    With RATE_LIMIT_BACKEND = 'shared' the budget is shared by every
+    process using RATE_LIMIT_DB_PATH.
+    
     Args:
         service: Service name
         max_calls: Max calls per period
@@ -92,12 +546,16 @@ def get_rate_limiter(service: str, max_calls: int = 60, period: float = 60.0) ->
     Returns:
         RateLimiter instance
     """
-    if service not in _rate_limiters:
-        _rate_limiters[service] = RateLimiter(max_calls, period)
-    return _rate_limiters[service]
-
-
-
-
-
+    with _rate_limiters_lock:
+        if service not in _rate_limiters:
+            if RATE_LIMIT_BACKEND == 'shared':
+                _rate_limiters[service] = SharedRateLimiter(service, max_calls, period)
+            else:
+                _rate_limiters[service] = RateLimiter(max_calls, period)
+        return _rate_limiters[service]
 
+def get_rate_limit_stats() -> Dict[str, Dict]:
+    """Get current effective limits for every service limiter"""
+    with _rate_limiters_lock:
+        limiters = dict(_rate_limiters)
+    return {service: limiter.get_stats() for service, limiter in limiters.items()}
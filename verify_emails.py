@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Bulk email verification for the Eleven Views Opportunity Engine
+Verify the addresses of qualified leads before they reach an email campaign
+"""
+
+import argparse
+from typing import Dict, Optional
+from database import Database
+from utils.email_finder import get_email_finder
+from utils.logger import get_logger
+from config import EMAIL_VERIFY_WORKERS
+
+logger = get_logger('verify_emails')
+
+class LeadEmailVerifier:
+    """Verify lead email addresses in bulk and store the results"""
+    
+    def __init__(self):
+        self.db = Database()
+        self.email_finder = get_email_finder()
+    
+    def _email_status(self, result: Dict) -> Optional[str]:
+        """
+        Map a verify_email result to the stored email_status
+        
+        Returns:
+            Status to store, or None if the address was not really verified
+            (format check only, e.g. provider unavailable)
+        """
+        if result.get('reason') == 'invalid_format':
+            return 'invalid'
+        if result.get('provider') == 'basic':
+            return None
+        return result.get('reason') or 'unknown'
+    
+    def verify_leads(
+        self,
+        status: Optional[str] = 'qualified',
+        min_score: Optional[int] = None,
+        budget: Optional[int] = None,
+        workers: int = EMAIL_VERIFY_WORKERS
+    ) -> Dict:
+        """
+        Verify every lead email that has not been verified yet
+        
+        Args:
+            status: Lead status to verify (None for all)
+            min_score: Minimum AI lead score
+            budget: Most verification requests to spend (cached and
+                duplicate addresses are free)
+            workers: Concurrent verification requests
+        
+        Returns:
+            Summary statistics
+        """
+        leads = self.db.get_unverified_emails(status=status, min_score=min_score)
+        stats = {
+            'leads': len(leads),
+            'verified': 0,
+            'deferred': 0,
+            'by_status': {}
+        }
+        if not leads:
+            return stats
+        
+        if not self.email_finder.hunter_api_key:
+            logger.warning("HUNTER_API_KEY not set: only address formats can be checked")
+        
+        results = self.email_finder.verify_emails(
+            [lead['email'] for lead in leads],
+            max_calls=budget,
+            max_workers=workers
+        )
+        
+        verifications = []
+        for lead in leads:
+            result = results.get(lead['email'].strip().lower())
+            email_status = self._email_status(result) if result else None
+            if email_status is None:
+                stats['deferred'] += 1
+                continue
+            
+            verifications.append({
+                'id': lead['id'],
+                'email': lead['email'],
+                'email_status': email_status,
+                'email_score': result.get('score')
+            })
+            stats['by_status'][email_status] = stats['by_status'].get(email_status, 0) + 1
+        
+        stats['verified'] = self.db.save_email_verifications(verifications)
+        return stats
+
+
+def main():
+    """CLI interface for bulk email verification"""
+    parser = argparse.ArgumentParser(description='Verify lead email addresses in bulk')
+    
+    parser.add_argument(
+        '--status',
+        type=str,
+        choices=['new', 'qualified', 'contacted', 'converted', 'rejected', 'all'],
+        default='qualified',
+        help='Status of leads to verify'
+    )
+    
+    parser.add_argument(
+        '--min-score',
+        type=int,
+        default=None,
+        help='Minimum AI lead score'
+    )
+    
+    parser.add_argument(
+        '--budget',
+        type=int,
+        default=None,
+        help='Maximum verification requests to spend this run (default: no limit)'
+    )
+    
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=EMAIL_VERIFY_WORKERS,
+        help='Concurrent verification requests'
+    )
+    
+    args = parser.parse_args()
+    
+    print("\n" + "="*60)
+    print("📧 EMAIL VERIFICATION")
+    print("="*60 + "\n")
+    
+    verifier = LeadEmailVerifier()
+    stats = verifier.verify_leads(
+        status=None if args.status == 'all' else args.status,
+        min_score=args.min_score,
+        budget=args.budget,
+        workers=args.workers
+    )
+    
+    if not stats['leads']:
+        print("✅ No unverified emails found")
+        return
+    
+    print(f"✅ Verified {stats['verified']} of {stats['leads']} leads")
+    for email_status, count in sorted(stats['by_status'].items()):
+        print(f"   {email_status}: {count}")
+    if stats['deferred']:
+        print(f"⏳ {stats['deferred']} left unverified (budget reached or provider unavailable)")
+
+
+if __name__ == '__main__':
+    main()